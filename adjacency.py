@@ -0,0 +1,507 @@
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from collections.abc import Mapping
+
+try:
+    import numpy as np
+except ImportError: # NumPy is optional; only the dense backend needs it
+    np = None
+
+if np is not None:
+    _POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+_MASK64 = (1 << 64) - 1
+
+
+def edge_hash(u, v):
+    """64-bit hash of the undirected edge u-v (splitmix64 finaliser over the ordered pair).
+
+    A graph hashes to the XOR over its edges, which add_edge/remove_edge update in O(1).
+    """
+    if u > v:
+        u, v = v, u
+    x = ((u << 32) | v) + 0x9E3779B97F4A7C15 & _MASK64
+    x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9 & _MASK64
+    x = (x ^ (x >> 27)) * 0x94D049BB133111EB & _MASK64
+    return x ^ (x >> 31)
+
+
+def _edge_hash_xor(rows, cols):
+    # edge_hash over NumPy arrays of pairs with rows < cols, XOR-reduced (uint64 wraps like the masks above)
+    x = (rows.astype(np.uint64) << np.uint64(32) | cols.astype(np.uint64)) + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    x ^= x >> np.uint64(31)
+    return int(np.bitwise_xor.reduce(x)) if x.size else 0
+
+
+class SetAdjacency(defaultdict):
+    """Mutable adjacency backend: node -> set of neighbours, O(1) edge insertion and removal.
+
+    Edges must go through add_edge/remove_edge, which keep the edge count, the number of
+    odd-degree vertices and a union-find over the vertices with edges up to date, so Eulerian
+    and connectivity queries never have to scan the graph.
+    """
+
+    def __init__(self, default_factory=set):
+        # The argument only exists so defaultdict's pickling (which passes the factory back) keeps working
+        super().__init__(set)
+        self.version = 0 # Bumped on every edge change so derived forms (CSR) know when to rebuild
+        self.num_edges = 0
+        self.edge_hash = 0 # XOR of edge_hash() over the edges (self-loops excluded, like the other backends)
+        self.odd_degree_count = 0
+        # Union-find over the vertices that have edges. It cannot split a component, so a removal
+        # only marks it stale and the next connectivity query rebuilds it in O(n + m)
+        self._parent = {}
+        self._size = {}
+        self._components = 0
+        self._components_stale = False
+
+    @classmethod
+    def from_mapping(cls, graph, num_nodes):
+        # Thaws a frozen (or any node -> neighbours) graph back into a mutable one
+        adjacency = cls()
+        for u_node in range(1, num_nodes + 1):
+            for v_node in graph.get(u_node, ()):
+                if u_node < v_node <= num_nodes:
+                    adjacency.add_edge(u_node, v_node)
+        return adjacency
+
+    def __reduce__(self):
+        # defaultdict's own reduce drops the instance attributes, i.e. all the counters above
+        return (type(self), (), self.__dict__.copy(), None, iter(self.items()))
+
+    def _degree_changed(self, old_degree, new_degree):
+        if (old_degree ^ new_degree) & 1:
+            self.odd_degree_count += 1 if new_degree & 1 else -1
+
+    def _find(self, x):
+        parent = self._parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]] # Path halving
+            x = parent[x]
+        return x
+
+    def _union(self, u, v):
+        for node in (u, v):
+            if node not in self._parent:
+                self._parent[node] = node
+                self._size[node] = 1
+                self._components += 1
+        root_u, root_v = self._find(u), self._find(v)
+        if root_u != root_v:
+            if self._size[root_u] < self._size[root_v]:
+                root_u, root_v = root_v, root_u
+            self._parent[root_v] = root_u
+            self._size[root_u] += self._size[root_v]
+            self._components -= 1
+
+    def _rebuild_components(self):
+        self._parent = {}
+        self._size = {}
+        self._components = 0
+        for u, neighbours in self.items():
+            for v in neighbours:
+                if u <= v:
+                    self._union(u, v)
+        self._components_stale = False
+
+    def add_edge(self, u, v):
+        neighbours_u = self[u]
+        if v in neighbours_u:
+            return
+        degree_u = len(neighbours_u)
+        neighbours_u.add(v)
+        if u == v: # Self-loop: one more entry in a single set
+            self._degree_changed(degree_u, degree_u + 1)
+        else:
+            neighbours_v = self[v]
+            degree_v = len(neighbours_v)
+            neighbours_v.add(u)
+            self._degree_changed(degree_u, degree_u + 1)
+            self._degree_changed(degree_v, degree_v + 1)
+            self.edge_hash ^= edge_hash(u, v)
+        self.num_edges += 1
+        self.version += 1
+        if not self._components_stale:
+            self._union(u, v)
+
+    def remove_edge(self, u, v):
+        neighbours_u = self.get(u)
+        if neighbours_u is None or v not in neighbours_u:
+            return
+        degree_u = len(neighbours_u)
+        neighbours_u.discard(v)
+        if u == v:
+            self._degree_changed(degree_u, degree_u - 1)
+        else:
+            neighbours_v = self[v]
+            degree_v = len(neighbours_v)
+            neighbours_v.discard(u)
+            self._degree_changed(degree_u, degree_u - 1)
+            self._degree_changed(degree_v, degree_v - 1)
+            self.edge_hash ^= edge_hash(u, v)
+        self.num_edges -= 1
+        self.version += 1
+        self._components_stale = True
+
+    def edge_component_count(self):
+        """Number of connected components that contain at least one edge."""
+        if self._components_stale:
+            self._rebuild_components()
+        return self._components
+
+    def has_edge(self, u, v):
+        return u in self and v in self[u]
+
+    def degree(self, u):
+        return len(self[u]) if u in self else 0
+
+    def freeze(self, num_nodes):
+        return CSRAdjacency.from_mapping(self, num_nodes)
+
+
+class CSRAdjacency(Mapping):
+    """Frozen compressed-sparse-row adjacency for nodes 1..num_nodes.
+
+    neighbours[offsets[u]:offsets[u + 1]] holds the sorted neighbours of u, and edge_ids gives
+    each of those half-edges the id of its undirected edge (0..num_edges-1), so algorithms can
+    mark edges as used in a flat bytearray instead of deleting from adjacency lists.
+    """
+
+    version = 0 # Frozen: never changes
+
+    def __init__(self, num_nodes, offsets, neighbours, edge_ids):
+        self.num_nodes = num_nodes
+        self.offsets = offsets
+        self.neighbours = neighbours
+        self.edge_ids = edge_ids
+        self.num_edges = len(neighbours) // 2
+        self._view = memoryview(neighbours)
+        self._structure = None # (odd-degree vertices, edge components), filled lazily
+        self._edge_hash = None
+
+    def __reduce__(self):
+        # memoryviews (ours, or memory-mapped arrays from graph_io) cannot be pickled: ship plain arrays
+        return (type(self), (self.num_nodes, array('q', self.offsets), array('i', self.neighbours),
+                             array('i', self.edge_ids)))
+
+    @classmethod
+    def from_mapping(cls, graph, num_nodes):
+        if isinstance(graph, CSRAdjacency):
+            return graph
+        if isinstance(graph, DenseAdjacency):
+            return graph.to_csr()
+
+        offsets = array('q', bytes(8 * (num_nodes + 2)))
+        for u_node in range(1, num_nodes + 1):
+            degree = 0
+            for v_node in graph.get(u_node, ()):
+                if 1 <= v_node <= num_nodes and v_node != u_node:
+                    degree += 1
+            offsets[u_node + 1] = offsets[u_node] + degree
+
+        total = offsets[num_nodes + 1]
+        neighbours = array('i', bytes(4 * total))
+        edge_ids = array('i', bytes(4 * total))
+        fill = array('q', offsets)
+        next_id = 0
+        # Walking u in ascending order writes every node's smaller neighbours first and in order,
+        # so each row comes out sorted without a per-row sort of the reverse half-edges
+        for u_node in range(1, num_nodes + 1):
+            for v_node in sorted(graph.get(u_node, ())):
+                if v_node <= u_node or v_node > num_nodes:
+                    continue
+                pos = fill[u_node]
+                neighbours[pos] = v_node
+                edge_ids[pos] = next_id
+                fill[u_node] = pos + 1
+                pos = fill[v_node]
+                neighbours[pos] = u_node
+                edge_ids[pos] = next_id
+                fill[v_node] = pos + 1
+                next_id += 1
+        return cls(num_nodes, offsets, neighbours, edge_ids)
+
+    def __getitem__(self, u):
+        if not (isinstance(u, int) and 1 <= u <= self.num_nodes):
+            raise KeyError(u)
+        return self._view[self.offsets[u]:self.offsets[u + 1]]
+
+    def __contains__(self, u):
+        return isinstance(u, int) and 1 <= u <= self.num_nodes
+
+    def __iter__(self):
+        return iter(range(1, self.num_nodes + 1))
+
+    def __len__(self):
+        return self.num_nodes
+
+    def add_edge(self, u, v):
+        raise TypeError("CSR adjacency is frozen; build the graph with SetAdjacency and freeze() it afterwards.")
+
+    remove_edge = add_edge
+
+    def _compute_structure(self):
+        # Frozen graphs compute degree parity and components once, on first use
+        offsets, neighbours = self.offsets, self.neighbours
+        odd = 0
+        for u in range(1, self.num_nodes + 1):
+            odd += (offsets[u + 1] - offsets[u]) & 1
+        seen = bytearray(self.num_nodes + 1)
+        components = 0
+        for root in range(1, self.num_nodes + 1):
+            if seen[root] or offsets[root + 1] == offsets[root]:
+                continue
+            components += 1
+            seen[root] = 1
+            stack = [root]
+            while stack:
+                u = stack.pop()
+                for pos in range(offsets[u], offsets[u + 1]):
+                    v = neighbours[pos]
+                    if not seen[v]:
+                        seen[v] = 1
+                        stack.append(v)
+        self._structure = (odd, components)
+        return self._structure
+
+    @property
+    def odd_degree_count(self):
+        return (self._structure or self._compute_structure())[0]
+
+    def edge_component_count(self):
+        """Number of connected components that contain at least one edge."""
+        return (self._structure or self._compute_structure())[1]
+
+    @property
+    def edge_hash(self):
+        if self._edge_hash is None:
+            offsets, neighbours = self.offsets, self.neighbours
+            if np is not None:
+                cols = np.asarray(neighbours, dtype=np.int64)
+                rows = np.repeat(np.arange(self.num_nodes + 1, dtype=np.int64),
+                                 np.diff(np.asarray(offsets, dtype=np.int64)))
+                upper = cols > rows
+                self._edge_hash = _edge_hash_xor(rows[upper], cols[upper])
+            else:
+                value = 0
+                for u in range(1, self.num_nodes + 1):
+                    for pos in range(offsets[u], offsets[u + 1]):
+                        if neighbours[pos] > u:
+                            value ^= edge_hash(u, neighbours[pos])
+                self._edge_hash = value
+        return self._edge_hash
+
+    def has_edge(self, u, v):
+        if u not in self:
+            return False
+        lo, hi = self.offsets[u], self.offsets[u + 1]
+        pos = bisect_left(self.neighbours, v, lo, hi)
+        return pos < hi and self.neighbours[pos] == v
+
+    def degree(self, u):
+        return self.offsets[u + 1] - self.offsets[u] if u in self else 0
+
+    def freeze(self, num_nodes=None):
+        return self
+
+
+class DenseAdjacency(Mapping):
+    """Bit-packed adjacency matrix for nodes 1..num_nodes (requires NumPy).
+
+    bits[u] holds (num_nodes + 8) // 8 bytes with bit v (little-endian bit order) set when u-v is
+    an edge: n^2 / 8 bytes for the whole graph, however dense. Degrees, parity and connectivity
+    are NumPy reductions over the rows, cached until the next edge change.
+    """
+
+    def __init__(self, num_nodes):
+        if np is None:
+            raise ImportError("The dense adjacency backend requires NumPy.")
+        self.num_nodes = num_nodes
+        self.bits = np.zeros((num_nodes + 1, (num_nodes + 8) // 8), dtype=np.uint8) # Row 0 unused
+        self.version = 0
+        self._degrees = None
+        self._edge_hash = None
+        self._structure = None
+
+    def _changed(self):
+        self.version += 1
+        self._structure = None
+
+    def _set_bits(self, rows, cols):
+        # Unbuffered OR, so repeated (row, byte) pairs all land
+        np.bitwise_or.at(self.bits, (rows, cols >> 3), (1 << (cols & 7)).astype(np.uint8))
+
+    def add_cycle(self, nodes):
+        """Adds the edges nodes[0]-nodes[1]-...-nodes[-1]-nodes[0] in one vectorised pass."""
+        u_nodes = np.asarray(nodes, dtype=np.int64)
+        v_nodes = np.roll(u_nodes, -1)
+        keep = u_nodes != v_nodes # A one-node cycle is a self-loop, which the matrix does not store
+        self._set_bits(u_nodes[keep], v_nodes[keep])
+        self._set_bits(v_nodes[keep], u_nodes[keep])
+        self._degrees = None
+        self._edge_hash = None
+        self._changed()
+
+    def add_random_edges(self, probability, seed=None):
+        """Adds every vertex pair as an edge with the given probability.
+
+        The upper triangle is drawn in blocks of rows, and each block is packed into its rows
+        and, transposed, into the matching columns, so memory stays at one block of draws.
+        """
+        rng = np.random.default_rng(seed)
+        size = self.num_nodes + 1
+        cols = np.arange(size)
+        step = max(8, ((1 << 22) // size) & ~7) # Multiple of 8: blocks start on byte boundaries
+        for r0 in range(0, size, step):
+            r1 = min(r0 + step, size)
+            block = rng.random((r1 - r0, size)) < probability
+            block &= cols > np.arange(r0, r1)[:, None] # Upper triangle; also drops column 0
+            if r0 == 0:
+                block[0] = False
+            self.bits[r0:r1] |= np.packbits(block, axis=1, bitorder='little')
+            first = r0 >> 3
+            self.bits[:, first:first + (r1 - r0 + 7) // 8] |= np.packbits(block.T, axis=1, bitorder='little')
+        self._degrees = None
+        self._edge_hash = None
+        self._changed()
+
+    def degrees(self):
+        """Degree of every node as an int64 array indexed by node id."""
+        if self._degrees is None:
+            self._degrees = _POPCOUNT[self.bits].sum(axis=1, dtype=np.int64)
+        return self._degrees
+
+    def neighbours(self, u):
+        return np.flatnonzero(np.unpackbits(self.bits[u], bitorder='little')[:self.num_nodes + 1])
+
+    def __getitem__(self, u):
+        if not (isinstance(u, int) and 1 <= u <= self.num_nodes):
+            raise KeyError(u)
+        return self.neighbours(u).tolist()
+
+    def __contains__(self, u):
+        return isinstance(u, int) and 1 <= u <= self.num_nodes
+
+    def __iter__(self):
+        return iter(range(1, self.num_nodes + 1))
+
+    def __len__(self):
+        return self.num_nodes
+
+    def has_edge(self, u, v):
+        if u not in self or v not in self:
+            return False
+        return bool(self.bits[u, v >> 3] >> (v & 7) & 1)
+
+    def add_edge(self, u, v):
+        if u == v or self.has_edge(u, v):
+            return
+        self.bits[u, v >> 3] |= 1 << (v & 7)
+        self.bits[v, u >> 3] |= 1 << (u & 7)
+        if self._degrees is not None:
+            self._degrees[u] += 1
+            self._degrees[v] += 1
+        if self._edge_hash is not None:
+            self._edge_hash ^= edge_hash(u, v)
+        self._changed()
+
+    def remove_edge(self, u, v):
+        if not self.has_edge(u, v):
+            return
+        self.bits[u, v >> 3] &= ~(1 << (v & 7)) & 0xFF
+        self.bits[v, u >> 3] &= ~(1 << (u & 7)) & 0xFF
+        if self._degrees is not None:
+            self._degrees[u] -= 1
+            self._degrees[v] -= 1
+        if self._edge_hash is not None:
+            self._edge_hash ^= edge_hash(u, v)
+        self._changed()
+
+    def degree(self, u):
+        return int(self.degrees()[u]) if u in self else 0
+
+    @property
+    def num_edges(self):
+        return int(self.degrees().sum()) // 2
+
+    @property
+    def odd_degree_count(self):
+        return int(np.count_nonzero(self.degrees() & 1))
+
+    def edge_component_count(self):
+        """Number of connected components that contain at least one edge."""
+        if self._structure is None:
+            # Breadth-first search one frontier at a time: OR the frontier's rows, unpack once
+            size = self.num_nodes + 1
+            unvisited = self.degrees() > 0
+            components = 0
+            roots = np.flatnonzero(unvisited)
+            while roots.size:
+                components += 1
+                frontier = roots[:1]
+                unvisited[frontier] = False
+                while frontier.size:
+                    reach = np.bitwise_or.reduce(self.bits[frontier], axis=0)
+                    reached = np.unpackbits(reach, bitorder='little')[:size].astype(bool) & unvisited
+                    frontier = np.flatnonzero(reached)
+                    unvisited[frontier] = False
+                roots = np.flatnonzero(unvisited)
+            self._structure = components
+        return self._structure
+
+    def bitmask_rows(self):
+        # Little-endian bit order makes every packed row the int bitmask of its neighbours as is
+        return [int.from_bytes(row.tobytes(), 'little') for row in self.bits]
+
+    def _nonzero_blocks(self):
+        # (rows, cols) of the set bits, row-major, unpacking a bounded number of rows at a time
+        size = self.num_nodes + 1
+        step = max(1, (1 << 24) // size)
+        for r0 in range(0, size, step):
+            block = np.unpackbits(self.bits[r0:r0 + step], axis=1, bitorder='little')[:, :size]
+            rows, cols = np.nonzero(block)
+            yield (rows + r0).astype(np.int32), cols.astype(np.int32)
+
+    @property
+    def edge_hash(self):
+        if self._edge_hash is None:
+            value = 0
+            for rows, cols in self._nonzero_blocks():
+                upper = cols > rows
+                value ^= _edge_hash_xor(rows[upper], cols[upper])
+            self._edge_hash = value
+        return self._edge_hash
+
+    def to_csr(self):
+        """CSRAdjacency with the same layout and edge ids as CSRAdjacency.from_mapping would build."""
+        size = self.num_nodes + 1
+        degrees = self.degrees()
+        offsets = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(degrees[1:], out=offsets[2:])
+        # Row-major, so every row comes out sorted
+        row_parts, col_parts = zip(*self._nonzero_blocks())
+        rows = np.concatenate(row_parts)
+        cols = np.concatenate(col_parts)
+        # Edge ids number the pairs u < v in lexicographic order; the mirrored half-edges (v, u)
+        # get the same ids by sorting them on (u, v) too
+        edge_ids = np.empty(len(cols), dtype=np.int32)
+        upper = cols > rows
+        num_edges = int(np.count_nonzero(upper))
+        edge_ids[upper] = np.arange(num_edges, dtype=np.int32)
+        lower = np.flatnonzero(~upper)
+        edge_ids[lower[np.lexsort((rows[lower], cols[lower]))]] = np.arange(num_edges, dtype=np.int32)
+
+        csr_offsets, neighbours, csr_edge_ids = array('q'), array('i'), array('i')
+        csr_offsets.frombytes(offsets.tobytes())
+        neighbours.frombytes(cols.tobytes())
+        csr_edge_ids.frombytes(edge_ids.tobytes())
+        return CSRAdjacency(self.num_nodes, csr_offsets, neighbours, csr_edge_ids)
+
+    def freeze(self, num_nodes=None):
+        return self.to_csr()
+
+
+ADJACENCY_BACKENDS = ("set", "csr", "dense")
@@ -0,0 +1,218 @@
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from operations_on_graf import GraphGenerator, HAMILTONIAN_METHODS, BUDGET_EXHAUSTED, logger as graph_logger
+from corpus import generate_graph, EULERIZED_SUFFIX
+
+# Operations a job may list; the Hamiltonian search methods are operations of their own
+BATCH_OPERATIONS = ("is_eulerian", "euler", "euler_path", "hamiltonian_path") + HAMILTONIAN_METHODS
+GENERATED_KINDS = ("hamiltonian", "non_hamiltonian")
+
+
+def _load_job_graph(job, generator):
+    if "graph" in job:
+        generator.load(job["graph"])
+        return
+    spec = job.get("generate")
+    if not isinstance(spec, dict):
+        raise ValueError("job needs a 'graph' file or a 'generate' object")
+    kind = spec.get("kind", "hamiltonian")
+    if kind not in GENERATED_KINDS:
+        raise ValueError(f"unknown graph kind '{kind}', expected one of {GENERATED_KINDS}")
+    if spec.get("eulerize"):
+        kind += EULERIZED_SUFFIX
+    generate_graph((kind, int(spec["n"]), int(spec.get("saturation", 30)), spec.get("seed")), generator)
+
+
+def _run_operation(generator, operation, job, should_stop=None):
+    if operation == "is_eulerian":
+        return {'result': generator.is_eulerian()}
+    if operation == "euler":
+        cycle = generator.find_eulerian_cycle()
+        return {'result': cycle, 'status': "found" if cycle else "none"}
+    if operation == "euler_path":
+        trail = generator.find_eulerian_path()
+        return {'result': trail, 'status': "found" if trail else "none"}
+    if operation == "hamiltonian_path":
+        cycle = generator.find_hamiltonian_path(timeout=job.get("timeout"), max_expansions=job.get("max_expansions"),
+                                                precheck=job.get("precheck", True),
+                                                ordering=job.get("ordering", "numeric"), should_stop=should_stop)
+    else:
+        cycle = generator.find_hamiltonian_cycle(method=operation, workers=job.get("search_workers"),
+                                                 timeout=job.get("timeout"), max_expansions=job.get("max_expansions"),
+                                                 precheck=job.get("precheck", True),
+                                                 ordering=job.get("ordering", "numeric"), should_stop=should_stop)
+    stats = generator.last_search_stats
+    result = {'result': None if cycle is BUDGET_EXHAUSTED else cycle, 'status': stats['status'],
+              'nodes_expanded': stats['nodes_expanded']}
+    if 'certificate' in stats:
+        result['certificate'] = stats['certificate']
+    return result
+
+
+@contextlib.contextmanager
+def _captured_messages(stream):
+    # Routes the algorithms' log messages into stream only, for the duration of one job
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    level, propagate = graph_logger.level, graph_logger.propagate
+    graph_logger.addHandler(handler)
+    graph_logger.setLevel(logging.INFO)
+    graph_logger.propagate = False
+    try:
+        yield
+    finally:
+        graph_logger.removeHandler(handler)
+        graph_logger.setLevel(level)
+        graph_logger.propagate = propagate
+
+
+def execute_job(job, should_stop=None):
+    """Runs one job dict and returns its result record (errors included, never raised).
+
+    A failing operation gets {"error": ...} in results; the record's own "error" is kept for
+    jobs whose operations are invalid or whose graph cannot be loaded or generated.
+    should_stop is handed to the Hamiltonian searches, which end early once it returns True.
+    """
+    record = {'id': job.get("id")}
+    messages = io.StringIO()
+    start_t = time.perf_counter()
+    try:
+        operations = job.get("operations", ["euler", "backtrack"])
+        for operation in operations:
+            if operation not in BATCH_OPERATIONS:
+                raise ValueError(f"unknown operation '{operation}', expected one of {BATCH_OPERATIONS}")
+
+        generator = GraphGenerator()
+        with _captured_messages(messages):
+            gen_start = time.perf_counter()
+            _load_job_graph(job, generator)
+            record['gen_time'] = time.perf_counter() - gen_start
+            record['n'] = generator.num_nodes
+            record['edges'] = generator.graph.num_edges
+            if generator.last_eulerize_edges:
+                record['eulerize_edges'] = generator.last_eulerize_edges
+            results = {}
+            record['results'] = results
+            for operation in operations:
+                op_start = time.perf_counter()
+                try:
+                    result = _run_operation(generator, operation, job, should_stop)
+                except Exception as e: # Fails this operation only; the others still run
+                    result = {'error': f"{type(e).__name__}: {e}"}
+                result['time'] = time.perf_counter() - op_start
+                results[operation] = result
+    except Exception as e: # Bad operations, or a graph that cannot be loaded or generated: fails the job
+        record['error'] = f"{type(e).__name__}: {e}"
+    if messages.getvalue():
+        record['messages'] = messages.getvalue().splitlines()
+    record['time'] = time.perf_counter() - start_t
+    return record
+
+
+def run_job(line):
+    """Runs one JSON job line and returns its JSON result line."""
+    try:
+        job = json.loads(line)
+        if not isinstance(job, dict):
+            raise ValueError("job must be a JSON object")
+    except ValueError as e:
+        return json.dumps({'error': f"{type(e).__name__}: {e}"}, separators=(',', ':'))
+    return json.dumps(execute_job(job), separators=(',', ':'))
+
+
+def _error_line(line, error):
+    # Result line for a job whose worker failed; the id is recovered from the job line if possible
+    try:
+        job_id = json.loads(line).get("id")
+    except (ValueError, AttributeError):
+        job_id = None
+    return json.dumps({'id': job_id, 'error': f"{type(error).__name__}: {error}"}, separators=(',', ':'))
+
+
+def _job_result(line, future):
+    try:
+        return future.result()
+    except Exception as e: # A crashed or killed worker (BrokenProcessPool), an unpicklable result, ...
+        return _error_line(line, e)
+
+
+def _job_lines(lines):
+    for line in lines:
+        if line.strip():
+            yield line
+
+
+def run_batch(input_file, output_file, workers=None, ordered=True):
+    """Streams JSON-lines jobs from input_file through a process pool into output_file.
+
+    Each job holds "generate" ({"kind", "n", "saturation", "seed", "eulerize"}) or a saved
+    "graph" file, plus "operations" from BATCH_OPERATIONS and optional "id", "timeout",
+    "max_expansions", "precheck" and "ordering". At most a few jobs per worker are in flight, so input is
+    read lazily and results are written (and flushed) as they finish: in input order when
+    ordered, else in completion order. Returns the number of jobs processed.
+    """
+    workers = workers or os.cpu_count() or 1
+    count = 0
+    if workers == 1:
+        for line in _job_lines(input_file):
+            try:
+                result = run_job(line)
+            except Exception as e:
+                result = _error_line(line, e)
+            output_file.write(result + "\n")
+            output_file.flush()
+            count += 1
+        return count
+
+    max_in_flight = workers * 4
+    pending = deque() # (job line, future) in submission order, for ordered output
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        lines = _job_lines(input_file)
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_in_flight:
+                line = next(lines, None)
+                if line is None:
+                    exhausted = True
+                    continue
+                try:
+                    future = executor.submit(run_job, line)
+                except BrokenProcessPool: # A worker died: its jobs fail, the rest go to a fresh pool
+                    executor.shutdown(wait=False)
+                    executor = ProcessPoolExecutor(max_workers=workers)
+                    future = executor.submit(run_job, line)
+                pending.append((line, future))
+            if not pending:
+                break
+            if ordered:
+                finished = [pending.popleft()]
+            else:
+                done, _ = wait([future for _, future in pending], return_when=FIRST_COMPLETED)
+                finished = [entry for entry in pending if entry[1] in done]
+                for entry in finished:
+                    pending.remove(entry)
+            for line, future in finished:
+                output_file.write(_job_result(line, future) + "\n")
+                count += 1
+            output_file.flush()
+    finally:
+        executor.shutdown()
+    return count
+
+
+def run_batch_files(input_path, output_path=None, workers=None, ordered=True):
+    # "-" (or no output path) means stdin / stdout
+    with contextlib.ExitStack() as stack:
+        input_file = sys.stdin if input_path == "-" else stack.enter_context(open(input_path))
+        output_file = sys.stdout if output_path in (None, "-") else stack.enter_context(open(output_path, 'w'))
+        return run_batch(input_file, output_file, workers, ordered)
@@ -0,0 +1,275 @@
+import contextlib
+import cProfile
+import csv
+import logging
+import math
+import os
+import statistics
+import time
+import tracemalloc
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from operations_on_graf import GraphGenerator, HAMILTONIAN_METHODS, logger as graph_logger
+from hamiltonian_engines import SEARCH_ORDERINGS
+from instrumentation import INSTRUMENT_FIELDS
+from corpus import GraphCorpus, generate_graph, EULERIZED_SUFFIX
+
+BENCHMARK_ALGORITHMS = ("euler",) + HAMILTONIAN_METHODS
+GRAPH_KINDS = ("hamiltonian", "non_hamiltonian")
+# generate_non_hamiltonian_graph always starts from a 70% saturated graph
+NON_HAMILTONIAN_SATURATION = 70
+
+# Two-sided 95% Student t critical values for 1..30 degrees of freedom; beyond that the normal value is close enough
+_T_95 = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+         2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+         2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042)
+
+TRIAL_FIELDS = ['kind', 'n', 'saturation', 'algorithm', 'trial', 'seed', 'gen_time', 'csr_time', 'solve_time', 'found', 'status',
+                'nodes_expanded', 'max_depth', 'prunes', 'certificate']
+SUMMARY_FIELDS = ['kind', 'n', 'saturation', 'algorithm', 'trials', 'unknown', 'mean', 'median', 'p95', 'stddev',
+                  'ci95_low', 'ci95_high', 'gen_median', 'csr_median']
+
+
+def parse_range(spec):
+    """Parses "start:stop[:step]" (Python range semantics) or a comma separated list of ints."""
+    if ':' in spec:
+        parts = [int(p) for p in spec.split(':')]
+        return list(range(*parts))
+    return [int(p) for p in spec.split(',') if p.strip()]
+
+
+def trial_seed(base_seed, kind, n, saturation, trial):
+    # crc32 rather than hash(): str hashes are randomised per process
+    return zlib.crc32(f"{base_seed}:{kind}:{n}:{saturation}:{trial}".encode())
+
+
+def parse_algorithm(spec):
+    """Splits "method[:ordering]" (e.g. "bitset:warnsdorff") into (method, ordering)."""
+    method, _, ordering = spec.partition(':')
+    return method, ordering or "numeric"
+
+
+def _solve(generator, algorithm, options):
+    if algorithm == "euler":
+        result = generator.find_eulerian_cycle()
+        return result, {'status': "found" if result else "none"}
+    method, ordering = parse_algorithm(algorithm)
+    result = generator.find_hamiltonian_cycle(method=method, workers=options.get('search_workers'),
+                                              timeout=options.get('timeout'),
+                                              max_expansions=options.get('max_expansions'),
+                                              precheck=options.get('precheck', True), ordering=ordering)
+    return result, generator.last_search_stats
+
+
+@contextlib.contextmanager
+def _quiet_algorithms():
+    # The algorithms log every miss; keep that out of the sweep output (errors still get through)
+    level = graph_logger.level
+    graph_logger.setLevel(logging.ERROR)
+    try:
+        yield
+    finally:
+        graph_logger.setLevel(level)
+
+
+def _profile_run(generator, algorithm, options, row, profile_dir, cell_name):
+    if options.get('tracemalloc'):
+        tracemalloc.start()
+    if profile_dir:
+        profiler = cProfile.Profile()
+        profiler.runcall(_solve, generator, algorithm, options)
+        profiler.dump_stats(os.path.join(profile_dir, f"{cell_name}.prof"))
+    else:
+        _solve(generator, algorithm, options)
+    if options.get('tracemalloc'):
+        row['tracemalloc_peak'] = tracemalloc.get_traced_memory()[1]
+        if profile_dir:
+            tracemalloc.take_snapshot().dump(os.path.join(profile_dir, f"{cell_name}.tracemalloc"))
+        tracemalloc.stop()
+
+
+def run_trial(task):
+    """Generates one seeded graph and times every requested algorithm on it."""
+    kind, n, saturation, trial, seed, algorithms, options = task
+    # Eulerized graphs share their seeds with the plain ones but are reported (and cached) as their own kind
+    if options.get('eulerize'):
+        kind += EULERIZED_SUFFIX
+    generator = GraphGenerator()
+    instrumentation = generator.enable_instrumentation() if options.get('instrument') else None
+    # cProfile output and tracemalloc snapshots are taken once per cell, on its first trial
+    profile_dir = options.get('profile_dir') if trial == 0 else None
+    rows = []
+    with _quiet_algorithms():
+        # With a corpus, gen_time is the (memory-mapped) load time of the pre-generated graph
+        start_t = time.perf_counter()
+        if options.get('corpus_dir'):
+            GraphCorpus(options['corpus_dir']).load_into(generator, (kind, n, saturation, seed))
+        else:
+            generate_graph((kind, n, saturation, seed), generator)
+        gen_time = time.perf_counter() - start_t
+        if not generator.graph:
+            return rows
+        # The CSR form and the connectivity/parity caches are shared by all algorithms: build them
+        # up front so no algorithm pays for them and the results do not depend on --algorithms order
+        start_t = time.perf_counter()
+        generator.csr().edge_component_count()
+        generator.graph.edge_component_count()
+        csr_time = time.perf_counter() - start_t
+        gen_counters = instrumentation.as_dict() if instrumentation is not None else {}
+
+        for algorithm in algorithms:
+            if instrumentation is not None:
+                instrumentation.reset()
+            generator.drop_search_inputs() # Orders and encoded rows are part of each algorithm's time
+            start_t = time.perf_counter()
+            result, stats = _solve(generator, algorithm, options)
+            solve_time = time.perf_counter() - start_t
+
+            row = {'kind': kind, 'n': n, 'saturation': saturation, 'algorithm': algorithm,
+                   'trial': trial, 'seed': seed, 'gen_time': gen_time, 'csr_time': csr_time, 'solve_time': solve_time,
+                   'found': int(bool(result)), 'status': stats['status'],
+                   'nodes_expanded': stats.get('nodes_expanded', ''), 'max_depth': stats.get('max_depth', ''),
+                   'prunes': stats.get('prunes', ''), 'certificate': stats.get('certificate', {}).get('check', '')}
+            if instrumentation is not None:
+                row.update(gen_counters)
+                row.update(instrumentation.as_dict())
+            if profile_dir or options.get('tracemalloc'):
+                # Profiling and tracing slow the algorithm down, so they get a repeat run outside solve_time
+                generator.drop_search_inputs()
+                _profile_run(generator, algorithm, options, row, profile_dir, f"{kind}_n{n}_s{saturation}_{algorithm}")
+            rows.append(row)
+    return rows
+
+
+def summarize(times):
+    """Median, p95, stddev and a 95% confidence interval for the mean of a list of timings."""
+    count = len(times)
+    ordered = sorted(times)
+    mean = statistics.fmean(ordered)
+    stddev = statistics.stdev(ordered) if count > 1 else 0.0
+    # Nearest-rank percentile: no interpolation between samples
+    p95 = ordered[max(0, math.ceil(0.95 * count) - 1)]
+    if count > 1:
+        t_value = _T_95[count - 2] if count - 1 <= len(_T_95) else 1.960
+        half_width = t_value * stddev / math.sqrt(count)
+    else:
+        half_width = 0.0
+    return {'mean': mean, 'median': statistics.median(ordered), 'p95': p95, 'stddev': stddev,
+            'ci95_low': mean - half_width, 'ci95_high': mean + half_width}
+
+
+def build_tasks(sizes_h, sizes_non_h, densities, algorithms, runs, base_seed, options):
+    tasks = []
+    for n in sizes_h:
+        for saturation in densities:
+            for trial in range(runs):
+                seed = trial_seed(base_seed, "hamiltonian", n, saturation, trial)
+                tasks.append(("hamiltonian", n, saturation, trial, seed, algorithms, options))
+    for n in sizes_non_h:
+        for trial in range(runs):
+            seed = trial_seed(base_seed, "non_hamiltonian", n, NON_HAMILTONIAN_SATURATION, trial)
+            tasks.append(("non_hamiltonian", n, NON_HAMILTONIAN_SATURATION, trial, seed, algorithms, options))
+    return tasks
+
+
+def _log_unknown(rows):
+    for row in rows:
+        if row['status'] == "unknown":
+            print(f"  Budget exhausted: {row['kind']} n={row['n']} sat={row['saturation']} {row['algorithm']} "
+                  f"trial {row['trial']} (seed {row['seed']}) after {row['solve_time']:.3f}s")
+
+
+def run_sweep(sizes_h, sizes_non_h, densities, algorithms, runs=20, workers=None, base_seed=0,
+              output_prefix="benchmark", timeout=None, max_expansions=None, instrument=False,
+              profile_dir=None, trace_memory=False, corpus_dir=None, corpus_max_bytes=None, eulerize=False,
+              precheck=True):
+    """Runs every trial in a process pool and writes the raw and summary CSVs in one pass each.
+
+    timeout and max_expansions bound each Hamiltonian search; trials that hit them are logged and
+    kept with status "unknown", their solve time being the (censored) time spent until the cut-off.
+    instrument adds the algorithm counters and phase times as extra trial columns; profile_dir
+    receives one cProfile dump (and tracemalloc snapshot with trace_memory) per cell.
+    With corpus_dir every graph is generated (in parallel) into a GraphCorpus before any timing
+    starts, and trials load it from there, so repeated sweeps run on identical inputs.
+    eulerize adds edges to every generated graph until all degrees are even (kind gets an
+    "_eulerized" suffix), so the euler algorithm times full traversals instead of early exits.
+    precheck=False disables the structural certificates, timing the searches on their own.
+    A Hamiltonian algorithm may name a neighbour ordering ("bitset:degree"), so orderings can be
+    compared as separate cells. The parallel search brings its own process pool, so when it is
+    benchmarked the trials run one at a time and every search gets the workers instead.
+    """
+    for algorithm in algorithms:
+        method, ordering = parse_algorithm(algorithm)
+        if method not in BENCHMARK_ALGORITHMS:
+            raise ValueError(f"Unknown benchmark algorithm '{algorithm}'. Expected one of {BENCHMARK_ALGORITHMS}.")
+        if ordering not in SEARCH_ORDERINGS or (ordering != "numeric" and method == "euler"):
+            raise ValueError(f"Unknown ordering in '{algorithm}'. Hamiltonian methods take one of {SEARCH_ORDERINGS}.")
+
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+    options = {'timeout': timeout, 'max_expansions': max_expansions, 'instrument': instrument,
+               'profile_dir': profile_dir, 'tracemalloc': trace_memory, 'corpus_dir': corpus_dir,
+               'eulerize': eulerize, 'precheck': precheck}
+    tasks = build_tasks(sizes_h, sizes_non_h, densities, algorithms, runs, base_seed, options)
+    workers = workers or os.cpu_count() or 1
+    if any(parse_algorithm(algorithm)[0] == "parallel" for algorithm in algorithms):
+        # A search pool inside every trial worker would run workers^2 processes
+        options['search_workers'] = workers
+
+    if corpus_dir:
+        corpus = GraphCorpus(corpus_dir, corpus_max_bytes)
+        suffix = EULERIZED_SUFFIX if eulerize else ""
+        built = corpus.fill([(kind + suffix, n, saturation, seed) for kind, n, saturation, _, seed, _, _ in tasks],
+                            workers)
+        print(f"Graph corpus in {corpus_dir}: {built} graph(s) generated, {len(tasks) - built} reused.")
+    trial_workers = 1 if 'search_workers' in options else workers
+    print(f"Running {len(tasks)} trials ({runs} per cell) on {trial_workers} worker(s)...")
+
+    trial_rows = []
+    if trial_workers == 1:
+        for task in tasks:
+            rows = run_trial(task)
+            _log_unknown(rows)
+            trial_rows.extend(rows)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for rows in executor.map(run_trial, tasks, chunksize=max(1, len(tasks) // (workers * 8))):
+                _log_unknown(rows)
+                trial_rows.extend(rows)
+
+    cells = {}
+    for row in trial_rows:
+        key = (row['kind'], row['n'], row['saturation'], row['algorithm'])
+        cells.setdefault(key, []).append(row)
+
+    summary_rows = []
+    for (kind, n, saturation, algorithm), rows in cells.items():
+        stats = summarize([row['solve_time'] for row in rows])
+        summary = {'kind': kind, 'n': n, 'saturation': saturation, 'algorithm': algorithm, 'trials': len(rows),
+                   'unknown': sum(1 for row in rows if row['status'] == "unknown"),
+                   'gen_median': statistics.median(row['gen_time'] for row in rows),
+                   'csr_median': statistics.median(row['csr_time'] for row in rows)}
+        summary.update(stats)
+        summary_rows.append(summary)
+        print(f"  {kind:<16} n={n:<5} sat={saturation:<3} {algorithm:<9} "
+              f"median {stats['median']:.8f}s  p95 {stats['p95']:.8f}s  "
+              f"mean {stats['mean']:.8f}s +/- {stats['mean'] - stats['ci95_low']:.8f}s")
+
+    trials_file = f"{output_prefix}_trials.csv"
+    summary_file = f"{output_prefix}_summary.csv"
+    with open(trials_file, 'w', newline='') as f:
+        fieldnames = list(TRIAL_FIELDS)
+        if trace_memory:
+            fieldnames.append('tracemalloc_peak')
+        if instrument:
+            fieldnames.extend(INSTRUMENT_FIELDS)
+        writer = csv.DictWriter(f, fieldnames=fieldnames, restval='', extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(trial_rows)
+    with open(summary_file, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(summary_rows)
+    print(f"\nBenchmark finished. Data saved to {trials_file} and {summary_file}.")
+    return summary_rows
@@ -0,0 +1,116 @@
+import os
+import random
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from operations_on_graf import GraphGenerator
+
+
+EULERIZED_SUFFIX = "_eulerized"
+
+
+def generate_graph(key, generator=None):
+    """Seeds the RNG and builds the graph for a corpus key; the benchmark generates through here too.
+
+    A generator name ending in EULERIZED_SUFFIX builds the same graph and then eulerizes it.
+    """
+    generator_name, n, saturation, seed = key
+    base_name = generator_name.removesuffix(EULERIZED_SUFFIX)
+    eulerize = base_name != generator_name
+    random.seed(seed)
+    if generator is None:
+        generator = GraphGenerator()
+    if base_name == "hamiltonian":
+        generator.generate_hamiltonian_graph(n, saturation, False, eulerize=eulerize)
+    else:
+        generator.generate_non_hamiltonian_graph(n, eulerize=eulerize)
+    return generator
+
+
+def _build_entry(task):
+    # Worker entry point: generate, then publish atomically so readers never see half a file
+    cache_dir, key = task
+    path = os.path.join(cache_dir, GraphCorpus.file_name(key))
+    if os.path.exists(path):
+        return path
+    generator = generate_graph(key)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    os.close(fd)
+    try:
+        generator.save(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+class GraphCorpus:
+    """On-disk cache of generated graphs keyed by (generator, n, saturation, seed).
+
+    Entries are binary graph files (see graph_io) and are opened memory-mapped. Least recently
+    used entries are evicted once the directory grows past max_bytes; reads refresh an entry's
+    mtime, which is what the LRU order is based on.
+    """
+
+    def __init__(self, cache_dir, max_bytes=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def file_name(key):
+        generator_name, n, saturation, seed = key
+        return f"{generator_name}_n{n}_s{saturation}_seed{seed}.bin"
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, self.file_name(key))
+
+    def __contains__(self, key):
+        return os.path.exists(self.path(key))
+
+    def load_into(self, generator, key):
+        """Loads the cached graph into generator, generating and storing it first on a miss."""
+        path = self.path(key)
+        if not os.path.exists(path):
+            _build_entry((self.cache_dir, key))
+        os.utime(path) # Mark as recently used
+        return generator.load(path)
+
+    def fill(self, keys, workers=None):
+        """Generates every missing key in a process pool, then enforces the size limit."""
+        missing = [key for key in dict.fromkeys(keys) if key not in self]
+        if missing:
+            workers = workers or os.cpu_count() or 1
+            tasks = [(self.cache_dir, key) for key in missing]
+            if workers == 1:
+                for task in tasks:
+                    _build_entry(task)
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(_build_entry, tasks, chunksize=max(1, len(tasks) // (workers * 8))))
+        self.evict(protect=keys)
+        return len(missing)
+
+    def evict(self, protect=()):
+        """Deletes least recently used entries until the corpus fits in max_bytes."""
+        if self.max_bytes is None:
+            return []
+        protected = {self.file_name(key) for key in protect}
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".bin"):
+                info = entry.stat()
+                total += info.st_size
+                entries.append((info.st_mtime, entry.name, info.st_size))
+        removed = []
+        for _, name, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name in protected:
+                continue
+            os.remove(os.path.join(self.cache_dir, name))
+            total -= size
+            removed.append(name)
+        return removed
@@ -0,0 +1,56 @@
+import random
+from math import isqrt
+
+# Pairs u < v over node ids 1..n are numbered 0..n(n-1)/2 - 1 row by row:
+# (1,2), (1,3), ..., (1,n), (2,3), ..., (n-1,n)
+
+
+def pair_to_index(u, v, n):
+    if u > v:
+        u, v = v, u
+    u -= 1
+    v -= 1
+    return u * (2 * n - u - 1) // 2 + (v - u - 1)
+
+
+def index_to_pair(index, n):
+    total = n * (n - 1) // 2
+    u = n - 2 - (isqrt(4 * n * (n - 1) - 8 * index - 7) - 1) // 2
+    v = index + u + 1 - total + (n - u) * (n - u - 1) // 2
+    return u + 1, v + 1
+
+
+def _sample_indices(total, k, excluded):
+    """Uniform k-subset of range(total) minus excluded, by rejection. Expects k <= half of what is left."""
+    chosen = set()
+    while len(chosen) < k:
+        index = random.randrange(total)
+        if index not in excluded:
+            chosen.add(index)
+    return chosen
+
+
+def sample_new_edges(n, k, existing_pairs):
+    """Yields k distinct pairs (u, v), u < v, drawn uniformly from the pairs not in existing_pairs.
+
+    Only O(min(k, free - k)) indices are ever held in memory, where free is the number of
+    candidate pairs, instead of materialising and shuffling all n(n-1)/2 of them.
+    """
+    total = n * (n - 1) // 2
+    excluded = {pair_to_index(u, v, n) for u, v in existing_pairs}
+    free = total - len(excluded)
+    k = max(0, min(k, free))
+
+    if k <= free - k:
+        for index in _sample_indices(total, k, excluded):
+            yield index_to_pair(index, n)
+        return
+
+    # Dense case: sample the pairs to leave out, then stream the rest in index order
+    excluded |= _sample_indices(total, free - k, excluded)
+    index = 0
+    for u in range(1, n + 1):
+        for v in range(u + 1, n + 1):
+            if index not in excluded:
+                yield u, v
+            index += 1
@@ -0,0 +1,70 @@
+import mmap
+import struct
+import sys
+from array import array
+
+from adjacency import CSRAdjacency
+
+# File layout (little-endian):
+#   header   magic, format version, num_nodes, num_edges
+#   offsets  int64 x (num_nodes + 2)   -- same indexing as CSRAdjacency.offsets
+#   neighbours int32 x 2 * num_edges
+#   edge_ids   int32 x 2 * num_edges
+GRAPH_MAGIC = b"GRAFCSR\0"
+GRAPH_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sIIQ")
+
+
+def _write_array(f, values, typecode):
+    data = values if isinstance(values, array) and values.typecode == typecode else array(typecode, values)
+    if sys.byteorder != "little":
+        data = array(typecode, data)
+        data.byteswap()
+    data.tofile(f)
+
+
+def save_graph(csr, path):
+    """Writes a CSRAdjacency to path in the binary graph format."""
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(GRAPH_MAGIC, GRAPH_FORMAT_VERSION, csr.num_nodes, csr.num_edges))
+        _write_array(f, csr.offsets, 'q')
+        _write_array(f, csr.neighbours, 'i')
+        _write_array(f, csr.edge_ids, 'i')
+
+
+def load_graph(path):
+    """Memory-maps a saved graph and returns a CSRAdjacency whose arrays are views into the file.
+
+    Nothing is parsed or copied: pages are read lazily by the OS as the algorithms touch them.
+    """
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(mapped) < _HEADER.size:
+        raise ValueError(f"{path} is too short to be a graph file.")
+    magic, version, num_nodes, num_edges = _HEADER.unpack_from(mapped, 0)
+    if magic != GRAPH_MAGIC:
+        raise ValueError(f"{path} is not a graph file (bad magic {magic!r}).")
+    if version != GRAPH_FORMAT_VERSION:
+        raise ValueError(f"{path} uses graph format version {version}, expected {GRAPH_FORMAT_VERSION}.")
+
+    offsets_end = _HEADER.size + 8 * (num_nodes + 2)
+    neighbours_end = offsets_end + 4 * 2 * num_edges
+    edge_ids_end = neighbours_end + 4 * 2 * num_edges
+    if len(mapped) != edge_ids_end:
+        raise ValueError(f"{path} has {len(mapped)} bytes, expected {edge_ids_end} for "
+                         f"{num_nodes} nodes and {num_edges} edges.")
+
+    view = memoryview(mapped)
+    if sys.byteorder != "little":
+        # Views cannot byte-swap; fall back to swapped copies on big-endian machines
+        offsets, neighbours, edge_ids = array('q'), array('i'), array('i')
+        offsets.frombytes(view[_HEADER.size:offsets_end])
+        neighbours.frombytes(view[offsets_end:neighbours_end])
+        edge_ids.frombytes(view[neighbours_end:edge_ids_end])
+        for data in (offsets, neighbours, edge_ids):
+            data.byteswap()
+    else:
+        offsets = view[_HEADER.size:offsets_end].cast('q')
+        neighbours = view[offsets_end:neighbours_end].cast('i')
+        edge_ids = view[neighbours_end:edge_ids_end].cast('i')
+    return CSRAdjacency(num_nodes, offsets, neighbours, edge_ids)
@@ -0,0 +1,612 @@
+import multiprocessing
+import os
+import time
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from adjacency import DenseAdjacency
+
+try:
+    import numpy as np
+except ImportError: # NumPy is optional; the Held-Karp table falls back to array('I')
+    np = None
+
+# The DP table packs end-vertex sets into uint32 words, one bit per non-start vertex, which would
+# allow 33 nodes; memory is the real limit: about 16 bytes per subset of the other vertices at peak
+# (table, masks, popcounts and layer temporaries), i.e. ~0.5 GiB at 26 nodes and 64 GiB at 33
+HELD_KARP_MAX_NODES = 26
+
+# Wall-clock checks are amortised over this many expansions (must be a power of two minus one)
+_CLOCK_CHECK_MASK = 1023
+
+# Neighbour orderings for the depth-first engines: static ones become a relabelling of the graph
+# (so the engines' lowest-id-first order follows them), warnsdorff re-ranks at every step and
+# random restarts with a fresh shuffle on a Luby schedule
+SEARCH_ORDERINGS = ("numeric", "degree", "warnsdorff", "random")
+# Expansions per unit of the Luby restart schedule
+RESTART_UNIT = 1024
+
+
+class _BudgetExhausted:
+    """Third search outcome next to a cycle and None: the search stopped before it could decide."""
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return "BUDGET_EXHAUSTED"
+
+
+BUDGET_EXHAUSTED = _BudgetExhausted()
+
+
+class SearchBudget:
+    """Expansion/time limits for one search, plus the statistics the engines report back."""
+
+    def __init__(self, timeout=None, max_expansions=None, should_stop=None):
+        self.deadline = time.perf_counter() + timeout if timeout is not None else None
+        self.max_expansions = max_expansions
+        self.should_stop = should_stop
+        self.nodes_expanded = 0
+        self.max_depth = 0
+        self.prunes = 0
+        self.backtracks = 0
+        self.exhausted = None # Reason the search was cut short, if it was
+
+    def over(self, expansions):
+        """Polled by the engines with their running expansion count; True means stop now."""
+        if self.max_expansions is not None and expansions >= self.max_expansions:
+            self.exhausted = "max_expansions"
+            return True
+        if expansions & _CLOCK_CHECK_MASK == 0:
+            return self.spent(expansions)
+        return False
+
+    def spent(self, expansions):
+        """Unamortised check, for engines that only poll between large steps."""
+        if self.max_expansions is not None and expansions >= self.max_expansions:
+            self.exhausted = "max_expansions"
+        elif self.deadline is not None and time.perf_counter() >= self.deadline:
+            self.exhausted = "timeout"
+        elif self.should_stop is not None and self.should_stop():
+            self.exhausted = "cancelled"
+        return self.exhausted is not None
+
+    def record(self, expansions, max_depth, prunes, backtracks=0):
+        self.nodes_expanded += expansions
+        self.max_depth = max(self.max_depth, max_depth)
+        self.prunes += prunes
+        self.backtracks += backtracks
+
+    def as_dict(self):
+        return {'nodes_expanded': self.nodes_expanded, 'max_depth': self.max_depth, 'prunes': self.prunes,
+                'backtracks': self.backtracks, 'exhausted': self.exhausted}
+
+
+def to_bitmask_rows(graph, num_nodes):
+    """Encodes adjacency as a list of int bitmasks: bit v of rows[u] is set when u-v is an edge."""
+    # Index 0 is unused so that node ids 1..num_nodes map directly onto bit positions
+    if isinstance(graph, DenseAdjacency): # Its packed rows already are these bitmasks
+        return graph.bitmask_rows()
+    rows = [0] * (num_nodes + 1)
+    for u_node in range(1, num_nodes + 1):
+        mask = 0
+        for v_node in graph.get(u_node, ()):
+            if 1 <= v_node <= num_nodes and v_node != u_node:
+                mask |= 1 << v_node
+        rows[u_node] = mask
+    return rows
+
+
+def _is_connected(rows, mask):
+    """Flood fill restricted to the vertices in mask."""
+    if not mask:
+        return True
+    seen = mask & -mask
+    frontier = seen
+    while frontier:
+        low = frontier & -frontier
+        frontier ^= low
+        new = rows[low.bit_length() - 1] & mask & ~seen
+        seen |= new
+        frontier |= new
+    return seen == mask
+
+
+def _expand(rows, current, start, unvisited):
+    """Returns the mask of vertices worth visiting after current, or 0 if the branch is dead."""
+    ends = (1 << current) | (1 << start)
+    forced_cur = 0 # Unvisited vertices whose only two options include current
+    forced_start = 0 # Same for the start vertex (it still owes the closing edge)
+    m = unvisited
+    while m:
+        low = m & -m
+        m ^= low
+        avail = rows[low.bit_length() - 1] & (unvisited | ends)
+        deg = avail.bit_count()
+        if deg < 2:
+            return 0 # Every remaining vertex needs two cycle edges
+        if deg == 2:
+            if avail >> current & 1:
+                forced_cur |= low
+            if avail >> start & 1:
+                forced_start |= low
+
+    if current == start:
+        # First step: the start vertex still has both of its cycle edges free
+        if forced_cur.bit_count() > 2:
+            return 0
+    else:
+        # current and start each have exactly one free edge left
+        if forced_cur.bit_count() > 1 or forced_start.bit_count() > 1:
+            return 0
+        # A vertex squeezed between current and start would close the cycle too early
+        if forced_cur & forced_start and unvisited.bit_count() > 1:
+            return 0
+
+    if not _is_connected(rows, unvisited):
+        return 0
+
+    candidates = rows[current] & unvisited
+    if forced_cur:
+        candidates &= forced_cur
+    return candidates
+
+
+def bitset_hamiltonian_cycle(rows, num_nodes, start_node, prefix=None, budget=None, warnsdorff=False):
+    """Iterative DFS over bitmask rows. Returns the cycle as a list closed on start_node, or None.
+
+    prefix fixes the first vertices of the path (it must begin with start_node), which is how the
+    parallel mode hands out subtrees. When budget runs out the search returns None and
+    budget.exhausted says why. Candidates are tried lowest id first, or with warnsdorff the one
+    with the fewest unvisited neighbours first.
+    """
+    full = ((1 << (num_nodes + 1)) - 1) & ~1
+    if num_nodes == 1:
+        return [start_node, start_node] if rows[start_node] >> start_node & 1 else None
+
+    path = list(prefix) if prefix else [start_node]
+    visited = 0
+    for vertex in path:
+        visited |= 1 << vertex
+    if len(path) == num_nodes:
+        return path + [start_node] if rows[path[-1]] >> start_node & 1 else None
+    candidates = _expand(rows, path[-1], start_node, full & ~visited)
+    if warnsdorff:
+        candidates = _warnsdorff_order(rows, candidates, full & ~visited)
+    stack = [candidates]
+    expansions = 0
+    prunes = 0
+    backtracks = 0
+    max_depth = len(path)
+    cycle = None
+
+    while stack:
+        candidates = stack[-1]
+        if not candidates:
+            stack.pop()
+            visited &= ~(1 << path.pop())
+            backtracks += 1
+            continue
+        if warnsdorff:
+            vertex = candidates.pop()
+            low = 1 << vertex
+        else:
+            low = candidates & -candidates
+            stack[-1] = candidates ^ low
+            vertex = low.bit_length() - 1
+        path.append(vertex)
+        visited |= low
+
+        if len(path) == num_nodes:
+            if rows[vertex] >> start_node & 1:
+                path.append(start_node)
+                cycle = path
+                break
+            path.pop()
+            visited ^= low
+            continue
+
+        expansions += 1
+        if budget is not None and budget.over(expansions):
+            break
+        if len(path) > max_depth:
+            max_depth = len(path)
+        next_candidates = _expand(rows, vertex, start_node, full & ~visited)
+        if not next_candidates:
+            prunes += 1
+        elif warnsdorff:
+            next_candidates = _warnsdorff_order(rows, next_candidates, full & ~visited)
+        stack.append(next_candidates)
+
+    if budget is not None:
+        budget.record(expansions, max_depth, prunes, backtracks)
+    return cycle
+
+
+def ranked_neighbours(offsets, neighbours, order):
+    """CSR neighbour array with every row sorted by position in order (returned as is for 1..n)."""
+    if all(vertex == index for index, vertex in enumerate(order, 1)):
+        return neighbours
+    rank = array('i', bytes(4 * len(offsets)))
+    for index, vertex in enumerate(order):
+        rank[vertex] = index
+    ranked = array('i', neighbours)
+    for u in range(1, len(offsets) - 1):
+        start, end = offsets[u], offsets[u + 1]
+        if end - start > 1:
+            ranked[start:end] = array('i', sorted(ranked[start:end], key=rank.__getitem__))
+    return ranked
+
+
+def backtrack_hamiltonian(offsets, neighbours, num_nodes, starts, cycle=True, budget=None, warnsdorff=False):
+    """Recursion-free DFS over CSR rows, trying each row's neighbours in stored order.
+
+    Returns a cycle closed on starts[0] when cycle is set, else a Hamiltonian path beginning at
+    the first vertex of starts from which one exists; None when there is none (or the budget ran
+    out, see budget.exhausted). The search state is the path, one row cursor per depth and a
+    visited bytearray (warnsdorff adds a candidate stack and unvisited-neighbour counts), all
+    flat arrays of at most num_nodes entries, so memory stays linear at any path length.
+    """
+    visited = bytearray(num_nodes + 1)
+    closes = None # Vertices adjacent to the start, which may end a cycle
+    if cycle:
+        starts = starts[:1]
+        closes = bytearray(num_nodes + 1)
+        for pos in range(offsets[starts[0]], offsets[starts[0] + 1]):
+            closes[neighbours[pos]] = 1
+    free = None # Unvisited neighbours per vertex, kept current for warnsdorff
+    candidates = neighbours # Frames index into the rows, or into the warnsdorff candidate stack
+    if warnsdorff:
+        free = array('i', [0]) + array('i', (offsets[u + 1] - offsets[u] for u in range(1, num_nodes + 1)))
+        candidates = array('i')
+    path = array('i')
+    cursor = array('q') # Next position to try in the frame of path[depth]
+    frame_end = array('q')
+    expansions = 0
+    prunes = 0
+    backtracks = 0
+    max_depth = 0
+    result = None
+    stopped = False
+
+    for vertex in starts:
+        while vertex:
+            visited[vertex] = 1
+            path.append(vertex)
+            if warnsdorff:
+                for pos in range(offsets[vertex], offsets[vertex + 1]):
+                    free[neighbours[pos]] -= 1
+            if len(path) == num_nodes and (closes is None or closes[vertex]):
+                result = path.tolist() + [starts[0]] if cycle else path.tolist()
+                break
+            if len(path) == num_nodes:
+                prunes += 1
+                frame_start = frame_stop = 0 # Leaf: an empty frame, popped right below
+            else:
+                expansions += 1
+                if budget is not None and budget.over(expansions):
+                    stopped = True
+                    break
+                if len(path) > max_depth:
+                    max_depth = len(path)
+                if warnsdorff:
+                    row = [v for v in neighbours[offsets[vertex]:offsets[vertex + 1]] if not visited[v]]
+                    row.sort(key=free.__getitem__) # Stable: ties keep the row order
+                    frame_start = len(candidates)
+                    candidates.extend(row)
+                    frame_stop = len(candidates)
+                else:
+                    frame_start, frame_stop = offsets[vertex], offsets[vertex + 1]
+            cursor.append(frame_start)
+            frame_end.append(frame_stop)
+
+            # Next unvisited candidate of the deepest frame, unwinding the frames that ran out
+            vertex = 0
+            while path:
+                pos, end = cursor[-1], frame_end[-1]
+                while pos < end and visited[candidates[pos]]:
+                    pos += 1
+                if pos < end:
+                    cursor[-1] = pos + 1
+                    vertex = candidates[pos]
+                    break
+                cursor.pop()
+                frame_end.pop()
+                last = path.pop()
+                visited[last] = 0
+                if warnsdorff:
+                    for pos in range(offsets[last], offsets[last + 1]):
+                        free[neighbours[pos]] += 1
+                    del candidates[frame_end[-1] if frame_end else 0:]
+                if len(path) < num_nodes - 1:
+                    backtracks += 1
+        if result is not None or stopped:
+            break
+
+    if budget is not None:
+        budget.record(expansions, max_depth, prunes, backtracks)
+    return result
+
+
+def luby(i):
+    """i-th term (from 1) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ..."""
+    while True:
+        k = i.bit_length()
+        if i == (1 << k) - 1:
+            return 1 << (k - 1)
+        i -= (1 << (k - 1)) - 1
+
+
+def vertex_order(graph, num_nodes, ordering, rng=None):
+    """Vertices 1..num_nodes in the order a static ordering wants them tried."""
+    vertices = list(range(1, num_nodes + 1))
+    if ordering == "degree": # Fewest neighbours first: the hardest vertices are placed early
+        vertices.sort(key=lambda v: (graph.degree(v), v))
+    elif ordering == "random":
+        rng.shuffle(vertices)
+    return vertices
+
+
+def relabel_rows(rows, order):
+    """Renames order[i] to i + 1. Returns (new rows, new_to_old) with new_to_old[new id] = old id."""
+    new_id = [0] * len(rows)
+    for index, vertex in enumerate(order, 1):
+        new_id[vertex] = index
+    new_rows = [0] * len(rows)
+    for vertex in order:
+        mask = rows[vertex]
+        relabelled = 0
+        while mask:
+            low = mask & -mask
+            mask ^= low
+            relabelled |= 1 << new_id[low.bit_length() - 1]
+        new_rows[new_id[vertex]] = relabelled
+    return new_rows, [0] + list(order)
+
+
+def _warnsdorff_order(rows, candidates, unvisited):
+    # Candidates as a list to pop() from: fewest unvisited neighbours last, ties by lowest id
+    vertices = []
+    while candidates:
+        low = candidates & -candidates
+        candidates ^= low
+        vertices.append(low.bit_length() - 1)
+    vertices.sort(key=lambda v: ((rows[v] & unvisited).bit_count(), v), reverse=True)
+    return vertices
+
+
+def split_search_tree(rows, num_nodes, start_node, depth):
+    """Expands the pruned search tree breadth-first to the given depth.
+
+    Returns (prefixes, cycle): the surviving partial paths, or a finished cycle when the
+    graph is small enough to be solved during the split itself.
+    """
+    full = ((1 << (num_nodes + 1)) - 1) & ~1
+    frontier = [[start_node]]
+    for _ in range(depth):
+        next_frontier = []
+        for path in frontier:
+            visited = 0
+            for vertex in path:
+                visited |= 1 << vertex
+            if len(path) == num_nodes:
+                if rows[path[-1]] >> start_node & 1:
+                    return [], path + [start_node]
+                continue
+            candidates = _expand(rows, path[-1], start_node, full & ~visited)
+            while candidates:
+                low = candidates & -candidates
+                candidates ^= low
+                next_frontier.append(path + [low.bit_length() - 1])
+        frontier = next_frontier
+        if not frontier:
+            break
+    return frontier, None
+
+
+# How often the parallel mode checks its deadline and should_stop while chunks run
+_PARALLEL_POLL_SECONDS = 0.05
+
+# Per-process state for the parallel mode, installed once by the pool initializer so that
+# each task only carries its prefixes
+_worker_rows = None
+_worker_num_nodes = 0
+_worker_stop = None
+
+
+def _init_parallel_worker(rows, num_nodes, stop_event):
+    global _worker_rows, _worker_num_nodes, _worker_stop
+    _worker_rows = rows
+    _worker_num_nodes = num_nodes
+    _worker_stop = stop_event
+
+
+def _search_prefixes(prefixes, max_expansions):
+    budget = SearchBudget(max_expansions=max_expansions, should_stop=_worker_stop.is_set)
+    cycle = None
+    for prefix in prefixes:
+        if _worker_stop.is_set():
+            budget.exhausted = "cancelled"
+            break
+        remaining = None if max_expansions is None else max_expansions - budget.nodes_expanded
+        budget.max_expansions = remaining
+        cycle = bitset_hamiltonian_cycle(_worker_rows, _worker_num_nodes, prefix[0], prefix, budget)
+        if cycle or budget.exhausted:
+            break
+    return cycle, budget.as_dict()
+
+
+def _chunk_counts(stats):
+    return stats['nodes_expanded'], stats['max_depth'], stats['prunes'], stats['backtracks']
+
+
+def parallel_hamiltonian_cycle(rows, num_nodes, start_node, workers=None, split_depth=2, budget=None):
+    """Splits the bitset search at split_depth and solves the subtrees in a process pool.
+
+    The expansion limit of budget is shared out evenly between chunks; its timeout and
+    should_stop are enforced here, polled while the chunks run, by stopping the pool.
+    """
+    prefixes, cycle = split_search_tree(rows, num_nodes, start_node, split_depth)
+    if cycle or not prefixes:
+        return cycle
+
+    workers = workers or os.cpu_count() or 1
+    # A few chunks per worker keeps the pool busy when subtree sizes are uneven
+    chunk_count = min(len(prefixes), workers * 4)
+    chunks = [prefixes[i::chunk_count] for i in range(chunk_count)]
+    chunk_expansions = None
+    if budget is not None and budget.max_expansions is not None:
+        chunk_expansions = max(1, budget.max_expansions // chunk_count)
+    stop_event = multiprocessing.Event()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_parallel_worker,
+                             initargs=(rows, num_nodes, stop_event)) as executor:
+        futures = [executor.submit(_search_prefixes, chunk, chunk_expansions) for chunk in chunks]
+        pending = set(futures)
+        while pending and not cycle:
+            done, pending = wait(pending, timeout=_PARALLEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk_cycle, stats = future.result()
+                cycle = cycle or chunk_cycle
+                if budget is not None:
+                    budget.record(*_chunk_counts(stats))
+                    if stats['exhausted'] == "max_expansions":
+                        budget.exhausted = "max_expansions"
+            if budget is None or cycle:
+                continue
+            if budget.deadline is not None and time.perf_counter() >= budget.deadline:
+                budget.exhausted = "timeout"
+                break
+            if budget.should_stop is not None and budget.should_stop():
+                budget.exhausted = "cancelled"
+                break
+        # Running workers see the event at their next poll; queued chunks are dropped
+        stop_event.set()
+        for future in pending:
+            future.cancel()
+        running = [future for future in pending if not future.cancelled()]
+        if budget is not None: # Count the work of the chunks stopped mid-search too
+            for future in running:
+                budget.record(*_chunk_counts(future.result()[1]))
+    if cycle and budget is not None:
+        budget.exhausted = None
+    return cycle
+
+
+def _compact_rows(rows, num_nodes, start_node):
+    """Re-indexes bitmask rows onto 0..n-2 with the start vertex removed."""
+    others = [v for v in range(1, num_nodes + 1) if v != start_node]
+    position = {v: i for i, v in enumerate(others)}
+    compact = []
+    for v in others:
+        mask = 0
+        row = rows[v]
+        while row:
+            low = row & -row
+            row ^= low
+            w = low.bit_length() - 1
+            if w in position:
+                mask |= 1 << position[w]
+        compact.append(mask)
+    start_mask = 0
+    for w in range(1, num_nodes + 1):
+        if rows[start_node] >> w & 1 and w in position:
+            start_mask |= 1 << position[w]
+    return others, compact, start_mask
+
+
+def _held_karp_table_python(compact, start_mask, k, budget):
+    # table[mask] = set of end vertices v such that some path from start covers exactly mask and ends at v
+    table = array('I', bytes(4 * (1 << k)))
+    for v in range(k):
+        if start_mask >> v & 1:
+            table[1 << v] = 1 << v
+    for mask in range(1, 1 << k):
+        if budget is not None and budget.over(mask):
+            budget.record(mask, 0, 0)
+            return None
+        if mask & (mask - 1) == 0:
+            continue # Singletons were seeded above
+        ends = 0
+        m = mask
+        while m:
+            low = m & -m
+            m ^= low
+            if table[mask ^ low] & compact[low.bit_length() - 1]:
+                ends |= low
+        table[mask] = ends
+    if budget is not None:
+        budget.record(1 << k, 0, 0)
+    return table
+
+
+def _held_karp_table_numpy(compact, start_mask, k, budget):
+    size = 1 << k
+    table = np.zeros(size, dtype=np.uint32)
+    masks = np.arange(size, dtype=np.uint32)
+    popcount = np.zeros(size, dtype=np.uint8)
+    for v in range(k):
+        popcount += ((masks >> v) & 1).astype(np.uint8)
+        if start_mask >> v & 1:
+            table[1 << v] = 1 << v
+    nbr = np.array(compact, dtype=np.uint32)
+    # Layer by popcount so every mask ^ bit lookup hits an already finished entry
+    processed = k
+    for layer in range(2, k + 1):
+        if budget is not None and budget.spent(processed):
+            budget.record(processed, 0, 0)
+            return None
+        layer_masks = masks[popcount == layer]
+        processed += len(layer_masks)
+        ends = np.zeros(layer_masks.shape, dtype=np.uint32)
+        for v in range(k):
+            bit = np.uint32(1 << v)
+            has_v = (layer_masks & bit) != 0
+            prev = table[layer_masks[has_v] ^ bit]
+            ends[has_v] |= np.where((prev & nbr[v]) != 0, bit, np.uint32(0))
+        table[layer_masks] = ends
+    if budget is not None:
+        budget.record(processed, 0, 0)
+    return table
+
+
+def held_karp_hamiltonian_cycle(rows, num_nodes, start_node, budget=None):
+    """Exact O(2^n * n) subset DP. Returns the cycle as a list closed on start_node, or None.
+
+    Every subset counts as one expansion against budget; the NumPy path checks it once per layer.
+    """
+    if num_nodes > HELD_KARP_MAX_NODES:
+        raise ValueError(f"Held-Karp mode supports at most {HELD_KARP_MAX_NODES} nodes, got {num_nodes}.")
+    if num_nodes == 1:
+        return [start_node, start_node] if rows[start_node] >> start_node & 1 else None
+
+    others, compact, start_mask = _compact_rows(rows, num_nodes, start_node)
+    k = len(others)
+    if np is not None:
+        table = _held_karp_table_numpy(compact, start_mask, k, budget)
+    else:
+        table = _held_karp_table_python(compact, start_mask, k, budget)
+    if table is None:
+        return None
+
+    full = (1 << k) - 1
+    closing = int(table[full]) & start_mask
+    if not closing:
+        return None
+
+    # Walk the parent pointers back: the predecessor of v is any end of mask ^ v adjacent to v
+    low = closing & -closing
+    path = []
+    mask = full
+    while True:
+        v = low.bit_length() - 1
+        path.append(others[v])
+        mask ^= low
+        if not mask:
+            break
+        parents = int(table[mask]) & compact[v]
+        low = parents & -parents
+    path.append(start_node)
+    path.reverse()
+    path.append(start_node)
+    return path
@@ -0,0 +1,52 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+# Shared no-op context for disabled instrumentation, so a phase boundary costs one attribute check
+_NO_PHASE = nullcontext()
+
+# Columns the benchmark adds to its trial CSV when instrumentation is on (expansions and prunes
+# already have columns of their own there)
+INSTRUMENT_FIELDS = ['backtracks', 'edge_pops', 'edge_skips', 'allocated_bytes',
+                     'phase_cycle', 'phase_sampling', 'phase_isolate', 'phase_eulerize', 'phase_copy',
+                     'phase_degree_check', 'phase_traversal', 'phase_precheck', 'phase_encode', 'phase_search']
+
+
+class Instrumentation:
+    """Opt-in counters and phase timers for the graph algorithms.
+
+    GraphGenerator.instrumentation is None by default; the algorithms then skip every call into
+    this class. Hot loops keep plain local counters and hand over their totals once per call.
+    """
+
+    def __init__(self):
+        self.counters = defaultdict(int)
+        self.phases = defaultdict(float)
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    @contextmanager
+    def phase(self, name):
+        start_t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - start_t
+
+    def reset(self):
+        self.counters.clear()
+        self.phases.clear()
+
+    def as_dict(self):
+        result = dict(self.counters)
+        for name, seconds in self.phases.items():
+            result[f"phase_{name}"] = seconds
+        return result
+
+
+def phase(instrumentation, name):
+    """instrumentation.phase(name), or a shared no-op context when instrumentation is None."""
+    if instrumentation is None:
+        return _NO_PHASE
+    return instrumentation.phase(name)
@@ -1,8 +1,14 @@
 import argparse
-import csv
-import time
+import logging
+import sys
 import matplotlib.pyplot as plt
-from operations_on_graf import GraphGenerator # Ensure operations_on_graf.py is in the same directory
+from operations_on_graf import GraphGenerator, BUDGET_EXHAUSTED # Ensure operations_on_graf.py is in the same directory
+from benchmark import run_sweep, parse_range
+from batch import run_batch_files
+from adjacency import ADJACENCY_BACKENDS
+from result_cache import HamiltonianResultCache
+from service import run_service
+from regression import run_regression, DEFAULT_BASELINES, DEFAULT_THRESHOLD
 
 def plot_results(n_values, times, title, filename):
     """Generates and saves a plot of time vs. number of nodes."""
@@ -20,85 +26,26 @@ def plot_results(n_values, times, title, filename):
     print(f"Plot saved as {filename}")
     # plt.show() # Uncomment to display plots interactively
 
-def run_benchmark():
-    """Runs the benchmark tests for graph algorithms with averaging and saves to CSV."""
+def run_benchmark(args):
+    """Runs the configured benchmark sweep in a process pool and saves raw and summary CSVs."""
     print("Initializing benchmark...")
-    generator = GraphGenerator()
-    
-    NUM_RUNS = 20
-
-    # --- Define filenames for the results ---
-    f_euler_h = 'benchmark_euler_on_hamiltonian.csv'
-    f_hamilton_h = 'benchmark_hamilton_on_hamiltonian.csv'
-    f_hamilton_non_h = 'benchmark_hamilton_on_non_hamiltonian.csv'
-
-    # --- Clear or create files with headers ---
-    for filename in [f_euler_h, f_hamilton_h, f_hamilton_non_h]:
-        with open(filename, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(['n', 'time'])
-
-    n_values_H_benchmark = list(range(11, 26, 2))
-    n_values_nonH_benchmark = list(range(10, 17, 2))
-
-    # --- Benchmark 1: Hamiltonian graphs ---
-    print(f"\n--- Starting Benchmark: Hamiltonian Graphs (Averaging over {NUM_RUNS} runs per N) ---")
-    for n_val in n_values_H_benchmark:
-        print(f"  Testing Hamiltonian graph with n={n_val}...")
-        
-        euler_times_for_this_n = []
-        hamilton_times_for_this_n = []
-
-        for i in range(NUM_RUNS):
-            generator.generate_hamiltonian_graph(n_val, 30, False)
-            if not generator.graph: continue
-
-            # Measure Eulerian cycle time
-            start_t = time.perf_counter()
-            _ = generator.find_eulerian_cycle()
-            euler_times_for_this_n.append(time.perf_counter() - start_t)
-
-            # Measure Hamiltonian cycle time
-            start_t = time.perf_counter()
-            _ = generator.find_hamiltonian_cycle()
-            hamilton_times_for_this_n.append(time.perf_counter() - start_t)
-
-        if euler_times_for_this_n:
-            avg_euler_time = sum(euler_times_for_this_n) / len(euler_times_for_this_n)
-            print(f"    Avg Eulerian cycle finding time: {avg_euler_time:.8f}s")
-            with open(f_euler_h, 'a', newline='') as f:
-                csv.writer(f).writerow([n_val, avg_euler_time])
-
-        if hamilton_times_for_this_n:
-            avg_hamilton_time = sum(hamilton_times_for_this_n) / len(hamilton_times_for_this_n)
-            print(f"    Avg Hamiltonian cycle finding time: {avg_hamilton_time:.8f}s")
-            with open(f_hamilton_h, 'a', newline='') as f:
-                csv.writer(f).writerow([n_val, avg_hamilton_time])
-
-
-    # --- Benchmark 2: Non-Hamiltonian graphs ---
-    print(f"\n--- Starting Benchmark: Non-Hamiltonian Graphs (Averaging over {NUM_RUNS} runs per N) ---")
-    for n_val in n_values_nonH_benchmark:
-        print(f"  Testing Non-Hamiltonian graph with n={n_val}...")
-        
-        hamilton_times_for_this_n_nonH = []
-        
-        for i in range(NUM_RUNS):
-            generator.generate_non_hamiltonian_graph(n_val)
-            if not generator.graph: continue
-
-            # Measure Hamiltonian cycle time
-            start_t = time.perf_counter()
-            _ = generator.find_hamiltonian_cycle()
-            hamilton_times_for_this_n_nonH.append(time.perf_counter() - start_t)
-
-        if hamilton_times_for_this_n_nonH:
-            avg_hamilton_time_nonH = sum(hamilton_times_for_this_n_nonH) / len(hamilton_times_for_this_n_nonH)
-            print(f"    Avg Hamiltonian cycle finding time: {avg_hamilton_time_nonH:.8f}s")
-            with open(f_hamilton_non_h, 'a', newline='') as f:
-                csv.writer(f).writerow([n_val, avg_hamilton_time_nonH])
-    
-    print("\nBenchmark finished. Data saved to .csv files.")
+    run_sweep(sizes_h=parse_range(args.sizes),
+              sizes_non_h=parse_range(args.non_h_sizes),
+              densities=parse_range(args.densities),
+              algorithms=[a.strip() for a in args.algorithms.split(',') if a.strip()],
+              runs=args.runs,
+              workers=args.workers,
+              base_seed=args.seed,
+              output_prefix=args.output_prefix,
+              timeout=args.timeout,
+              max_expansions=args.max_expansions,
+              instrument=args.instrument,
+              profile_dir=args.profile_dir,
+              trace_memory=args.tracemalloc,
+              corpus_dir=args.corpus_dir,
+              corpus_max_bytes=args.corpus_max_mb * 1024 * 1024 if args.corpus_max_mb else None,
+              eulerize=args.eulerize,
+              precheck=not args.no_precheck)
     
 
 def main_interactive(generator_instance):
@@ -126,7 +73,11 @@ def main_interactive(generator_instance):
                         print("Note: The path doesn't form a complete cycle")
             case 'findh':
                 cycle = generator_instance.find_hamiltonian_cycle()
-                if cycle:
+                if generator_instance.last_search_stats.get('cached'):
+                    print("(Result taken from the Hamiltonian result cache.)")
+                if cycle is BUDGET_EXHAUSTED:
+                    print("Search budget exhausted: Hamiltonicity of this graph is unknown.")
+                elif cycle:
                     print("\nHamiltonian cycle found:")
                     print(" -> ".join(map(str, cycle)))
                     if cycle[0] == cycle[-1] and \
@@ -139,10 +90,9 @@ def main_interactive(generator_instance):
                 if generator_instance.num_nodes == 0:
                     print("Graph is empty or not properly generated. Cannot export to TikZ.")
                 else:
-                    tikz_code = generator_instance.export_to_tikz()
-                    with open("graph.tikz", "w") as f:
-                        f.write(tikz_code)
-                    print("Graph exported to graph.tikz")
+                    with open("graph.tikz", 'w', buffering=1 << 20) as f: # Streamed: large graphs are never joined into one string
+                        generator_instance.write_tikz(f)
+                    print("TikZ code saved to graph.tikz")
             case 'exit':
                 break
             case _:
@@ -155,13 +105,88 @@ def main():
     mode_group.add_argument("--hamilton", action="store_true", help="Generate Hamiltonian graph (interactive)")
     mode_group.add_argument("--non-hamilton", action="store_true", help="Generate Non-Hamiltonian graph (interactive)")
     mode_group.add_argument("--benchmark", action="store_true", help="Run performance benchmarks")
+    mode_group.add_argument("--load", metavar="FILE", help="Load a saved binary graph (interactive)")
+    mode_group.add_argument("--batch", metavar="FILE", help="Run JSON-lines jobs from FILE ('-' for stdin) without prompts")
+    mode_group.add_argument("--serve", metavar="ADDRESS", help="Serve jobs over HOST:PORT or unix:/path (JSON lines)")
+    mode_group.add_argument("--regression", action="store_true",
+                            help="Time and verify the algorithms against the stored baselines (exit status 1 on failure)")
+    parser.add_argument("--save", metavar="FILE", help="Save the generated graph to a binary file")
+    parser.add_argument("--result-cache", metavar="FILE", default=None,
+                        help="Persist memoized Hamiltonian results in FILE across runs (interactive modes)")
+    parser.add_argument("--backend", choices=ADJACENCY_BACKENDS, default=None,
+                        help="Adjacency storage for generated graphs (default: set; dense needs NumPy)")
+    parser.add_argument("--eulerize", action="store_true",
+                        help="Add edges to generated graphs until every degree is even (also in benchmarks)")
+
+    bench_group = parser.add_argument_group("benchmark options")
+    bench_group.add_argument("--sizes", default="11:26:2", help="Node counts for Hamiltonian graphs, start:stop[:step] or a comma list")
+    bench_group.add_argument("--non-h-sizes", default="10:17:2", help="Node counts for non-Hamiltonian graphs")
+    bench_group.add_argument("--densities", default="30", help="Saturation percentages for Hamiltonian graphs")
+    bench_group.add_argument("--algorithms", default="euler,backtrack,bitset",
+                             help="Comma list of euler, backtrack, bitset, dp, parallel; a search may add "
+                                  ":numeric, :degree, :warnsdorff or :random (e.g. bitset:degree)")
+    bench_group.add_argument("--runs", type=int, default=20, help="Trials per (graph, n, saturation) cell")
+    bench_group.add_argument("--workers", type=int, default=None,
+                             help="Benchmark and batch worker processes (default: CPU count)")
+    bench_group.add_argument("--seed", type=int, default=0, help="Base seed; each trial derives its own seed from it")
+    bench_group.add_argument("--timeout", type=float, default=None, help="Per-search time limit in seconds")
+    bench_group.add_argument("--max-expansions", type=int, default=None, help="Per-search node expansion limit")
+    bench_group.add_argument("--no-precheck", action="store_true",
+                             help="Skip the structural non-Hamiltonicity checks and always run the search")
+    bench_group.add_argument("--instrument", action="store_true", help="Add algorithm counters and phase times as CSV columns")
+    bench_group.add_argument("--profile-dir", default=None, help="Write a cProfile dump per benchmark cell into this directory")
+    bench_group.add_argument("--tracemalloc", action="store_true", help="Record peak traced memory (and snapshots with --profile-dir)")
+    bench_group.add_argument("--corpus-dir", default=None, help="Pre-generate graphs into this cache directory and reuse them")
+    bench_group.add_argument("--corpus-max-mb", type=int, default=None, help="Size limit of the graph corpus (LRU eviction)")
+    bench_group.add_argument("--output-prefix", default="benchmark", help="Prefix of the _trials.csv and _summary.csv files")
+    
+
+    batch_group = parser.add_argument_group("batch and service options")
+    batch_group.add_argument("--batch-output", metavar="FILE", default=None, help="Write result lines here instead of stdout")
+    batch_group.add_argument("--unordered", action="store_true", help="Emit results as jobs finish rather than in input order")
+    batch_group.add_argument("--max-pending", type=int, default=None,
+                             help="Requests the service runs or queues at once (default: 4 per worker)")
+    
+
+    regression_group = parser.add_argument_group("regression options")
+    regression_group.add_argument("--baselines", default=DEFAULT_BASELINES, help="Baselines file of the regression suite")
+    regression_group.add_argument("--update-baselines", action="store_true",
+                                  help="Store this machine's normalised times as the new baselines")
+    regression_group.add_argument("--regression-threshold", type=float, default=DEFAULT_THRESHOLD,
+                                  help="Allowed slowdown over the baseline as a fraction (default: 0.3)")
+    regression_group.add_argument("--regression-cases", default=None, help="Comma list of cases to run (default: all)")
     
     args = parser.parse_args()
+    # Options only the interactive modes use are rejected elsewhere rather than silently dropped
+    batch_mode = next((option for option, given in (("--benchmark", args.benchmark), ("--batch", args.batch),
+                                                    ("--serve", args.serve), ("--regression", args.regression))
+                       if given), None)
+    if args.save and batch_mode:
+        parser.error(f"--save cannot be used with {batch_mode}")
+    if args.backend and (batch_mode or args.load):
+        parser.error(f"--backend cannot be used with {batch_mode or '--load'} (it only applies to generated graphs)")
+
+    # The algorithms log their status messages; show them like the rest of the output, except where
+    # stdout carries the results
+    if args.batch or args.serve:
+        logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stderr)
+    else:
+        logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
     
     if args.benchmark:
-        run_benchmark()
+        run_benchmark(args)
+    elif args.batch:
+        run_batch_files(args.batch, args.batch_output, workers=args.workers, ordered=not args.unordered)
+    elif args.serve:
+        run_service(args.serve, workers=args.workers, max_pending=args.max_pending)
+    elif args.regression:
+        names = [c.strip() for c in args.regression_cases.split(',') if c.strip()] if args.regression_cases else None
+        failures = run_regression(names, baselines_path=args.baselines, threshold=args.regression_threshold,
+                                  update=args.update_baselines)
+        if failures:
+            sys.exit(1)
     else:
-        generator = GraphGenerator()
+        generator = GraphGenerator(backend=args.backend or "set")
         initial_graph_generated = False
 
         if args.hamilton:
@@ -187,7 +212,7 @@ def main():
                 except ValueError:
                     print("Error: Please enter a valid integer for saturation. Please try again.")
             
-            generator.generate_hamiltonian_graph(num_nodes, saturation, False)
+            generator.generate_hamiltonian_graph(num_nodes, saturation, False, eulerize=args.eulerize)
             if generator.graph and generator.num_nodes > 0:
                 print(f"Hamiltonian graph generated with {generator.num_nodes} nodes and saturation approx {saturation}%.")
                 initial_graph_generated = True
@@ -206,14 +231,32 @@ def main():
                 except ValueError:
                     print("Error: Please enter a valid integer for nodes. Please try again.")
             
-            generator.generate_non_hamiltonian_graph(num_nodes)
+            generator.generate_non_hamiltonian_graph(num_nodes, eulerize=args.eulerize)
             if generator.graph and generator.num_nodes > 0:
                 print(f"Non-Hamiltonian graph generated with {generator.num_nodes} nodes.")
                 initial_graph_generated = True
             else:
                 print("Failed to generate Non-Hamiltonian graph.")
         
+        elif args.load:
+            try:
+                generator.load(args.load)
+                print(f"Graph loaded from {args.load} with {generator.num_nodes} nodes and {generator.graph.num_edges} edges.")
+                initial_graph_generated = True
+            except (OSError, ValueError) as e:
+                print(f"Error: Could not load graph from {args.load}: {e}")
+
+        if initial_graph_generated and args.eulerize and generator.last_eulerize_edges:
+            added = generator.last_eulerize_edges
+            print(f"Eulerized: added {len(added)} edge(s): {', '.join(f'{u}-{v}' for u, v in added)}")
+
+        if initial_graph_generated and args.save:
+            generator.save(args.save)
+            print(f"Graph saved to {args.save}")
+
         if initial_graph_generated:
+            # Repeated findh calls on the same graph are answered from memory (and from FILE if given)
+            generator.result_cache = HamiltonianResultCache(path=args.result_cache)
             main_interactive(generator)
         else:
             print("No graph was generated. Exiting.")
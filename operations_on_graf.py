@@ -1,11 +1,46 @@
+import logging
 import math
 import random
-from collections import defaultdict
+import time
+from array import array
+from bisect import bisect_left
+from edge_sampling import sample_new_edges
+from adjacency import SetAdjacency, CSRAdjacency, DenseAdjacency, ADJACENCY_BACKENDS
+from graph_io import save_graph, load_graph
+from instrumentation import Instrumentation, phase
+from structure_checks import hamiltonian_obstruction, hamiltonian_path_obstruction, describe_obstruction
+from hamiltonian_engines import (to_bitmask_rows, bitset_hamiltonian_cycle, held_karp_hamiltonian_cycle,
+                                 parallel_hamiltonian_cycle, SearchBudget, BUDGET_EXHAUSTED,
+                                 SEARCH_ORDERINGS, RESTART_UNIT, luby, vertex_order, relabel_rows,
+                                 ranked_neighbours, backtrack_hamiltonian)
+
+HAMILTONIAN_METHODS = ("backtrack", "bitset", "dp", "parallel")
+
+# Status messages of the algorithms; main.py routes them to stdout, services and batch jobs capture them
+logger = logging.getLogger(__name__)
+
 
 class GraphGenerator:
-    def __init__(self):
-        self.graph = defaultdict(list)
+    def __init__(self, backend="set"):
+        if backend not in ADJACENCY_BACKENDS:
+            raise ValueError(f"Unknown adjacency backend '{backend}'. Expected one of {ADJACENCY_BACKENDS}.")
+        # "set" keeps the graph mutable; "csr" freezes it into offset/neighbour arrays after generation;
+        # "dense" generates straight into a NumPy bit matrix
+        self.backend = backend
+        self.graph = SetAdjacency()
         self.num_nodes = 0
+        self.last_search_stats = {} # Filled in by find_hamiltonian_cycle
+        self.last_eulerize_edges = [] # Edges added by the last eulerize()
+        self.instrumentation = None # Set by enable_instrumentation(); None keeps the hot paths untouched
+        self.result_cache = None # Optional HamiltonianResultCache consulted by find_hamiltonian_cycle
+        self._csr_source = None # Graph object and version the cached CSR form was built from
+        self._csr_version = -1
+        self._csr = None
+        # Search inputs derived from the graph (bitmask rows, static orders, rows ranked by them), keyed
+        # by what they are; dropped together when the graph or its version changes, like the CSR form
+        self._search_inputs = {}
+        self._search_inputs_source = None
+        self._search_inputs_version = -1
         # self.saturation = 0 # Not stored as a persistent attribute after generation
         # self.mode = "" # Not stored as a persistent attribute after generation
     
@@ -13,38 +48,106 @@ class GraphGenerator:
         if u <= 0 or v <= 0: # Basic check for valid node IDs
             # print(f"Warning: Attempting to add edge with non-positive node ID ({u}, {v})")
             return
-        if v not in self.graph[u]:
-            self.graph[u].append(v)
-        if u not in self.graph[v]:
-            self.graph[v].append(u)
-    
-    def generate_hamiltonian_graph(self, num_nodes_input, saturation_percent, notham_flag):
+        self.graph.add_edge(u, v)
+
+    def enable_instrumentation(self):
+        self.instrumentation = Instrumentation()
+        return self.instrumentation
+
+    def disable_instrumentation(self):
+        self.instrumentation = None
+
+    def remove_edge(self, u, v):
+        self.graph.remove_edge(u, v)
+
+    def graph_key(self):
+        # Identifies the labelled graph: the edge hash is kept up to date by every backend's add/remove
+        return (self.num_nodes, self.graph.num_edges, self.graph.edge_hash)
+
+    def freeze(self):
+        # Switch to the CSR form; the graph can no longer be modified afterwards
+        self.graph = self.graph.freeze(self.num_nodes)
+        return self.graph
+
+    def csr(self):
+        # CSR form of the current graph, built once per graph version and shared by the traversals
+        if isinstance(self.graph, CSRAdjacency):
+            return self.graph
+        if self._csr_source is not self.graph or self._csr_version != self.graph.version:
+            with phase(self.instrumentation, "copy"):
+                self._csr = CSRAdjacency.from_mapping(self.graph, self.num_nodes)
+            self._csr_source = self.graph
+            self._csr_version = self.graph.version
+            if self.instrumentation is not None:
+                self.instrumentation.count('allocated_bytes', sum(a.itemsize * len(a) for a in
+                                                                  (self._csr.offsets, self._csr.neighbours, self._csr.edge_ids)))
+        return self._csr
+
+    def _search_input(self, key, build):
+        # build() once per graph version and key; the engines only read what it returns
+        if self._search_inputs_source is not self.graph or self._search_inputs_version != self.graph.version:
+            self._search_inputs = {}
+            self._search_inputs_source = self.graph
+            self._search_inputs_version = self.graph.version
+        if key not in self._search_inputs:
+            self._search_inputs[key] = build()
+        return self._search_inputs[key]
+
+    def drop_search_inputs(self):
+        # The next search rebuilds its inputs; the benchmark uses it so each algorithm pays for its own
+        self._search_inputs = {}
+
+    def save(self, path):
+        # Binary CSR file, see graph_io for the layout
+        save_graph(self.csr(), path)
+
+    def load(self, path):
+        # The loaded graph is frozen and memory-mapped: nothing is parsed or copied into Python lists
+        self.graph = load_graph(path)
+        self.num_nodes = self.graph.num_nodes
+        return self.graph
+
+    def _apply_backend(self):
+        if self.backend == "csr":
+            self.freeze()
+
+    def generate_hamiltonian_graph(self, num_nodes_input, saturation_percent, notham_flag, eulerize=False):
+        self._generate_hamiltonian(num_nodes_input, saturation_percent, notham_flag)
+        if eulerize:
+            self.eulerize()
+        self._apply_backend()
+
+    def _generate_hamiltonian(self, num_nodes_input, saturation_percent, notham_flag):
         # Reset graph state for a new generation
-        self.graph = defaultdict(list)
+        self.graph = SetAdjacency()
         self.num_nodes = 0 
 
         if not notham_flag and num_nodes_input <= 10:
-            print("Error: Number of nodes must be greater than 10 for Hamiltonian graph generation when notham_flag is False.")
+            logger.error("Error: Number of nodes must be greater than 10 for Hamiltonian graph generation when notham_flag is False.")
             return
         
         if num_nodes_input <= 0:
-            print("Error: Number of nodes must be positive.")
+            logger.error("Error: Number of nodes must be positive.")
             return
         
         self.num_nodes = num_nodes_input # Set the number of nodes for this graph instance
 
         nodes = list(range(1, self.num_nodes + 1))
         random.shuffle(nodes)
+        if self.backend == "dense":
+            self._generate_dense(nodes, saturation_percent)
+            return
         
         # 1. Create a Hamiltonian cycle
         current_edges_count = 0
         if self.num_nodes > 0: # Only add cycle if there are nodes
-            for i in range(self.num_nodes):
-                # For n=1, (nodes[0] % nodes[0]) would be an edge to itself, which is fine for defaultdict.
-                # For n=0, this loop doesn't run.
-                u_node = nodes[i]
-                v_node = nodes[(i + 1) % self.num_nodes]
-                self.add_edge(u_node, v_node)
+            with phase(self.instrumentation, "cycle"):
+                for i in range(self.num_nodes):
+                    # For n=1, (nodes[0] % nodes[0]) would be an edge to itself, which is fine for defaultdict.
+                    # For n=0, this loop doesn't run.
+                    u_node = nodes[i]
+                    v_node = nodes[(i + 1) % self.num_nodes]
+                    self.add_edge(u_node, v_node)
             # In an undirected graph, adding (a,b) and (b,a) counts as 1 edge.
             # The Hamiltonian cycle has num_nodes edges.
             current_edges_count = self.num_nodes if self.num_nodes > 1 else 0
@@ -73,44 +176,47 @@ class GraphGenerator:
                 if u_node_s != v_node_s : # Avoid self-loop for n=1 in set for counting
                      existing_edges_set.add((u_node_s, v_node_s))
         
-        # Collect all possible new edges (not in the cycle yet)
-        possible_new_edges = []
-        if self.num_nodes > 1:
-            for r_u in range(1, self.num_nodes + 1):
-                for r_v in range(r_u + 1, self.num_nodes + 1):
-                    if tuple(sorted((r_u, r_v))) not in existing_edges_set:
-                        possible_new_edges.append((r_u, r_v))
-        
-        random.shuffle(possible_new_edges)
-        
+        # Draw exactly the missing edges from the pairs not in the cycle yet, without listing them all
         edges_to_add_needed = target_edges - current_edges_count
-        added_extra_count = 0
-        
-        for edge_u, edge_v in possible_new_edges:
-            if added_extra_count >= edges_to_add_needed:
-                break
-            self.add_edge(edge_u, edge_v)
-            # current_edges_count += 1 # This count was already based on the set.
-            added_extra_count += 1
+        if self.num_nodes > 1 and edges_to_add_needed > 0:
+            with phase(self.instrumentation, "sampling"):
+                for edge_u, edge_v in sample_new_edges(self.num_nodes, edges_to_add_needed, existing_edges_set):
+                    self.add_edge(edge_u, edge_v)
         
         # Final setup for single node graph
         if self.num_nodes == 1 and 1 not in self.graph:
-            self.graph[1] = [] # Ensure node 1 exists as a key
+            self.graph[1] = set() # Ensure node 1 exists as a key
 
-    def generate_non_hamiltonian_graph(self, num_nodes_input):
-        self.graph = defaultdict(list) # Reset
+    def _generate_dense(self, nodes, saturation_percent):
+        # Same cycle-plus-saturation recipe, vectorised: every pair outside the cycle becomes an
+        # edge with the probability that hits the target edge count on average (NumPy draws, seeded
+        # from the random module, so random.seed() still fixes the graph)
+        graph = DenseAdjacency(self.num_nodes)
+        with phase(self.instrumentation, "cycle"):
+            graph.add_cycle(nodes)
+        max_possible_edges = self.num_nodes * (self.num_nodes - 1) // 2
+        cycle_edges = graph.num_edges
+        target_edges = min(max(int(max_possible_edges * saturation_percent / 100), cycle_edges), max_possible_edges)
+        if target_edges > cycle_edges:
+            with phase(self.instrumentation, "sampling"):
+                graph.add_random_edges((target_edges - cycle_edges) / (max_possible_edges - cycle_edges),
+                                       seed=random.getrandbits(64))
+        self.graph = graph
+
+    def generate_non_hamiltonian_graph(self, num_nodes_input, eulerize=False):
+        self.graph = SetAdjacency() # Reset
         self.num_nodes = 0
 
         if num_nodes_input <= 0:
-            print("Error: Number of nodes must be a positive integer for non-Hamiltonian graph.")
+            logger.error("Error: Number of nodes must be a positive integer for non-Hamiltonian graph.")
             return
 
         # Generate a Hamiltonian graph first (with 50% saturation, notham_flag=True)
         # notham_flag=True bypasses the >10 nodes restriction in generate_hamiltonian_graph
-        self.generate_hamiltonian_graph(num_nodes_input, 70, True)
+        self._generate_hamiltonian(num_nodes_input, 70, True)
 
         if not self.graph and num_nodes_input > 0:
-            print(f"Could not generate base Hamiltonian graph for n={num_nodes_input} to make non-Hamiltonian.")
+            logger.error(f"Could not generate base Hamiltonian graph for n={num_nodes_input} to make non-Hamiltonian.")
             self.num_nodes = 0 # Indicate failure
             return
         # self.num_nodes is now set by generate_hamiltonian_graph
@@ -120,234 +226,496 @@ class GraphGenerator:
             
             if node_to_isolate in self.graph:
                 # Remove edges from other nodes to the isolated node
-                for neighbor in list(self.graph[node_to_isolate]): # Iterate over a copy
-                    if node_to_isolate in self.graph[neighbor]:
-                        self.graph[neighbor].remove(node_to_isolate)
-                # Clear the isolated node's own adjacency list
-                self.graph[node_to_isolate] = []
+                with phase(self.instrumentation, "isolate"):
+                    for neighbor in list(self.graph[node_to_isolate]): # Iterate over a copy
+                        self.graph.remove_edge(node_to_isolate, neighbor)
             # Ensure the node key exists even if isolated
             elif 1 <= node_to_isolate <= self.num_nodes :
-                 self.graph[node_to_isolate] = []
+                 self.graph[node_to_isolate] = set()
 
 
         elif self.num_nodes == 1:
             # For n=1, it's already non-Hamiltonian. {1: []}
             if 1 not in self.graph: # Should be set by generate_hamiltonian_graph
-                self.graph[1] = []
+                self.graph[1] = set()
+
+        if eulerize: # Never touches the isolated vertex, so the graph stays non-Hamiltonian
+            self.eulerize()
+        self._apply_backend()
     
-    def print_graph(self):
+    def iter_graph_lines(self):
+        """Yields the adjacency list and degree table line by line (no trailing newlines)."""
         if not self.graph and self.num_nodes > 0: # Potentially graph with nodes but no edges
-             print(f"\nGraph with {self.num_nodes} nodes and no edges (or only isolated nodes).")
-             for node in range(1, self.num_nodes + 1):
-                 print(f"{node}: []")
-             print("\nNode degrees:")
-             for node in range(1, self.num_nodes + 1):
-                 print(f"Node {node}: 0")
-             return
+            yield f"\nGraph with {self.num_nodes} nodes and no edges (or only isolated nodes)."
+            for node in range(1, self.num_nodes + 1):
+                yield f"{node}: []"
+            yield "\nNode degrees:"
+            for node in range(1, self.num_nodes + 1):
+                yield f"Node {node}: 0"
+            return
         if not self.graph:
-            print("Graph is empty.")
+            yield "Graph is empty."
             return
-                
-        print("\nAdjacency list:")
+
+        yield "\nAdjacency list:"
         # Ensure all nodes from 1 to num_nodes are printed, even if isolated
         all_nodes_to_print = set(self.graph.keys())
         if self.num_nodes > 0:
             all_nodes_to_print.update(range(1,self.num_nodes+1))
 
         for node in sorted(list(all_nodes_to_print)):
-            print(f"{node}: {sorted(self.graph.get(node, []))}")
-        
-        print("\nNode degrees:")
+            yield f"{node}: {sorted(self.graph.get(node, []))}"
+
+        yield "\nNode degrees:"
         for node in sorted(list(all_nodes_to_print)):
-            print(f"Node {node}: {len(self.graph.get(node, []))}")
+            yield f"Node {node}: {self.graph.degree(node)}"
+
+    def format_graph(self):
+        return "\n".join(self.iter_graph_lines())
+
+    def print_graph(self):
+        for line in self.iter_graph_lines():
+            print(line)
+
+    def eulerize(self):
+        """Makes every degree even by adding edges that are not in the graph yet.
+
+        Odd-degree vertices are first paired greedily, highest degree first, with a direct edge
+        to a non-adjacent odd vertex. Any that are left join their nearest unpaired odd vertex
+        along a shortest path of non-edges. Vertices without edges are never used, so
+        connectivity and isolated vertices are kept. Returns the added edges, or None (graph
+        unchanged) if some odd vertex has no such path to a partner.
+        """
+        graph = self.graph
+        self.last_eulerize_edges = []
+        with phase(self.instrumentation, "eulerize"):
+            with_edges = [u for u in range(1, self.num_nodes + 1) if graph.degree(u)]
+            odd = [u for u in with_edges if graph.degree(u) & 1]
+            # Each added edge fixes at most two odd vertices, so len(odd) // 2 direct edges is the
+            # minimum; the most constrained vertices pick their partner first
+            odd.sort(key=lambda u: (-graph.degree(u), u))
+            planned = set()
+            pending = dict.fromkeys(odd) # Insertion-ordered set
+            leftover = {}
+            while pending:
+                u_node = next(iter(pending))
+                del pending[u_node]
+                for v_node in pending:
+                    if not graph.has_edge(u_node, v_node):
+                        del pending[v_node]
+                        planned.add((min(u_node, v_node), max(u_node, v_node)))
+                        break
+                else:
+                    leftover[u_node] = None
+
+            # The leftovers are pairwise adjacent. Paths are XOR-ed into the plan: every inner
+            # vertex keeps its parity, and a path running over an already planned edge cancels it,
+            # which re-pairs that edge's endpoints instead of adding both edges
+            while leftover:
+                u_node = next(iter(leftover))
+                del leftover[u_node]
+                path = self._complement_path(u_node, leftover, with_edges)
+                if path is None:
+                    logger.warning(f"Cannot eulerize: odd vertex {u_node} has no path of non-edges to another odd vertex.")
+                    return None
+                del leftover[path[-1]]
+                for a_node, b_node in zip(path, path[1:]):
+                    planned.symmetric_difference_update({(min(a_node, b_node), max(a_node, b_node))})
+
+            added = sorted(planned)
+            if added and isinstance(graph, CSRAdjacency): # Frozen graphs are thawed, extended and frozen again
+                self.graph = SetAdjacency.from_mapping(graph, self.num_nodes)
+            for u_node, v_node in added:
+                self.add_edge(u_node, v_node)
+            if added and isinstance(graph, CSRAdjacency):
+                self.freeze()
+        self.last_eulerize_edges = added
+        return added
+
+    def _complement_path(self, source, targets, candidates):
+        # BFS over the non-edges of the graph (restricted to candidates) from source to the
+        # nearest vertex in targets; returns the path as a vertex list, or None
+        graph = self.graph
+        parent = {source: None}
+        queue = [source]
+        for u_node in queue: # The list grows while it is walked
+            for v_node in candidates:
+                if v_node in parent or v_node == u_node or graph.has_edge(u_node, v_node):
+                    continue
+                parent[v_node] = u_node
+                if v_node in targets:
+                    path = [v_node]
+                    while parent[path[-1]] is not None:
+                        path.append(parent[path[-1]])
+                    return path[::-1]
+                queue.append(v_node)
+        return None
 
     def is_eulerian(self):
-        if not self.graph:
-            return False # An empty graph might be considered Eulerian by some defs, but usually needs connected non-empty.
-                         # For cycle finding, non-empty is implied.
-        if self.num_nodes == 0: return False
-
-        for node_key in self.graph: # Check degrees of nodes present in graph
-            if len(self.graph[node_key]) % 2 != 0:
-                return False
-        # Also check nodes that might be in range 1..num_nodes but isolated (degree 0 - even)
-        for i in range(1, self.num_nodes + 1):
-            if i not in self.graph and 0 % 2 != 0: # Degree 0 is even
-                 return False # This condition is never true, effectively means isolated nodes are fine.
-        return True # All present nodes have even degree
+        # O(1): the adjacency backend keeps the odd-degree count and the union-find over its edges
+        # up to date (CSR graphs compute them once), so no vertex is scanned here
+        if self.num_nodes == 0 or not self.graph.num_edges:
+            return False
+        # All degrees even, and every edge in one component (isolated vertices do not matter)
+        return self.graph.odd_degree_count == 0 and self.graph.edge_component_count() == 1
     
     def find_eulerian_cycle(self):
-        if not self.is_eulerian():
-            print("Graph is not Eulerian (not all vertices have even degree or graph is unsuitable).")
+        instrumentation = self.instrumentation
+        with phase(instrumentation, "degree_check"):
+            eulerian = self.is_eulerian()
+        if not eulerian:
+            logger.info("Graph is not Eulerian (not all vertices have even degree, or its edges are not connected).")
             return None
         
         if not self.graph: # No edges, no cycle
-            print("Graph is empty or has no edges, no Eulerian cycle.")
+            logger.info("Graph is empty or has no edges, no Eulerian cycle.")
             return None
 
-        # Ensure graph is connected (Hierholzer assumes this for a single cycle)
-        # For simplicity, this check is omitted here but is important for strict Eulerianess.
-        # The algorithm will find a cycle in the connected component of the start node.
-
-        graph_copy = defaultdict(list)
+        csr = self.csr()
+        offsets = csr.offsets
         start_node = -1
-        for u_node in self.graph:
-            if self.graph[u_node]: # Find a node with edges to start
+        for u_node in range(1, self.num_nodes + 1):
+            if offsets[u_node + 1] > offsets[u_node]: # Find a node with edges to start
                 start_node = u_node
-            graph_copy[u_node] = self.graph[u_node].copy()
         
         if start_node == -1: # No edges in the graph
-            print("Graph has no edges, no Eulerian cycle.")
+            logger.info("Graph has no edges, no Eulerian cycle.")
             return None
-            
-        stack = []
-        cycle = []
-        current_vertex = start_node
-        
-        while True:
-            if graph_copy[current_vertex]:
-                stack.append(current_vertex)
-                next_vertex = graph_copy[current_vertex].pop()
-                # Remove the reverse edge as it's an undirected graph
-                if current_vertex in graph_copy[next_vertex]: # Check if reverse edge exists
-                    graph_copy[next_vertex].remove(current_vertex)
-                else:
-                    # This case should ideally not happen in a consistent undirected graph representation
-                    # where add_edge adds symmetrically.
-                    # print(f"Warning: Edge {current_vertex}-{next_vertex} found, but not {next_vertex}-{current_vertex} in copy during Euler.")
-                    pass
-                current_vertex = next_vertex
-            else:
-                cycle.append(current_vertex)
-                if not stack:
-                    break
-                current_vertex = stack.pop()
+
+        traversal_start = time.perf_counter() if instrumentation is not None else 0.0
+        cycle, cursor = self._hierholzer(csr, start_node)
+
+        if instrumentation is not None:
+            # Everything below is derived after the fact so the traversal loop carries no counters
+            instrumentation.phases['traversal'] += time.perf_counter() - traversal_start
+            pops = len(cycle) - 1
+            scanned = sum(cursor[v] - offsets[v] for v in range(1, self.num_nodes + 1))
+            instrumentation.count('edge_pops', pops)
+            instrumentation.count('edge_skips', scanned - pops)
+            instrumentation.count('allocated_bytes', cursor.itemsize * len(cursor) + ((csr.num_edges + 7) >> 3))
         
-        cycle.reverse()
         if not cycle or cycle[0] != cycle[-1]: # Basic check for cycle property
             # This might happen if graph was not truly Eulerian (e.g. disconnected components with edges)
             # print("Hierholzer's algorithm did not produce a valid cycle for the given graph component.") # More detailed error.
             return None # Or return the path found. For strict cycle, return None.
-        return cycle
+        return cycle.tolist()
     
-    def _hamiltonian_cycle_util(self, current_vertex, path, visited, start_node):
-        visited[current_vertex] = True
-        path.append(current_vertex)
-
-        if len(path) == self.num_nodes:
-            if start_node in self.graph.get(current_vertex, []):
-                path.append(start_node) 
-                return True
+    def find_eulerian_path(self):
+        # Trail through every edge once: between the two odd-degree vertices, or a cycle when all
+        # degrees are even. Same O(n + m) traversal as find_eulerian_cycle
+        if self.num_nodes == 0 or not self.graph.num_edges or self.graph.odd_degree_count not in (0, 2) \
+                or self.graph.edge_component_count() != 1:
+            logger.info("Graph has no Eulerian path (more than two odd-degree vertices, or its edges are not connected).")
+            return None
+        csr = self.csr()
+        offsets = csr.offsets
+        start_node = next((u for u in range(1, self.num_nodes + 1) if (offsets[u + 1] - offsets[u]) & 1), None)
+        if start_node is None:
+            start_node = next(u for u in range(1, self.num_nodes + 1) if offsets[u + 1] > offsets[u])
+        return self._hierholzer(csr, start_node)[0].tolist()
+
+    def _hierholzer(self, csr, start_node):
+        # Traverse the CSR form without touching it: each vertex keeps a cursor into its neighbour
+        # row and walked edges are marked in a bitset indexed by edge id, so the only per-call
+        # state is n cursors plus m bits. Returns (trail from start_node, cursors)
+        offsets, neighbours, edge_ids = csr.offsets, csr.neighbours, csr.edge_ids
+        cursor = array('q', offsets)
+        used = bytearray((csr.num_edges + 7) >> 3)
+        stack = array('i')
+        trail = array('i')
+        current_vertex = start_node
+
+        while True:
+            pos = cursor[current_vertex]
+            end = offsets[current_vertex + 1]
+            while pos < end: # Skip edges already walked from the other side
+                edge = edge_ids[pos]
+                if not used[edge >> 3] >> (edge & 7) & 1:
+                    break
+                pos += 1
+            if pos < end:
+                cursor[current_vertex] = pos + 1
+                used[edge >> 3] |= 1 << (edge & 7)
+                stack.append(current_vertex)
+                current_vertex = neighbours[pos]
             else:
-                path.pop() 
-                visited[current_vertex] = False
-                return False
-
-        # Iterate over sorted neighbors for deterministic behavior (optional but good for testing)
-        for neighbor in sorted(self.graph.get(current_vertex, [])):
-            if neighbor in visited and not visited[neighbor]: # Ensure neighbor is a valid node key
-                if self._hamiltonian_cycle_util(neighbor, path, visited, start_node):
-                    return True 
-            elif neighbor not in visited:
-                # This case implies neighbor is outside the 1..num_nodes range if visited was initialized for that range.
-                # Or num_nodes was not set correctly.
-                # For safety, only proceed if neighbor is in visited's keys.
-                # print(f"Warning: Neighbor {neighbor} of {current_vertex} not in visited keys during Hamiltonian search.")
-                pass
-
-
-        path.pop() 
-        visited[current_vertex] = False
-        return False
-
-    def find_hamiltonian_cycle(self):
+                cursor[current_vertex] = pos
+                trail.append(current_vertex)
+                if not stack:
+                    break
+                current_vertex = stack.pop()
+        trail.reverse()
+        return trail, cursor
+
+    def find_hamiltonian_cycle(self, method="backtrack", workers=None, split_depth=2, timeout=None, max_expansions=None,
+                               precheck=True, ordering="numeric", should_stop=None):
+        # Returns the cycle, None when there provably is none, or BUDGET_EXHAUSTED when timeout (seconds)
+        # or max_expansions ran out first. Search statistics end up in self.last_search_stats; with a
+        # result_cache, decided results are memoized per graph_key() (stats then carry cached=True).
+        # precheck first looks for a linear-time structural certificate (see structure_checks) and
+        # skips the search when one exists; it is reported as stats['certificate'].
+        # ordering picks the neighbour order of the depth-first engines (see SEARCH_ORDERINGS);
+        # dp is exhaustive and ignores it, parallel supports the static orders only. should_stop is
+        # polled during the search; once it returns True the search ends like a spent budget.
+        if method not in HAMILTONIAN_METHODS:
+            raise ValueError(f"Unknown Hamiltonian search method '{method}'. Expected one of {HAMILTONIAN_METHODS}.")
+        if method == "parallel" and ordering in ("warnsdorff", "random"):
+            raise ValueError(f"The parallel search does not support the '{ordering}' ordering.")
+        return self._hamiltonian_search(method, False, timeout, max_expansions, precheck, ordering, should_stop,
+                                        workers, split_depth)
+
+    def find_hamiltonian_path(self, timeout=None, max_expansions=None, precheck=True, ordering="numeric",
+                              should_stop=None):
+        # Same contract as find_hamiltonian_cycle, for a path through every vertex (no closing edge).
+        # Always the CSR backtracker, which keeps its state in flat arrays and so scales to graphs of
+        # 10^5-10^6 vertices; results are cached apart from cycles
+        return self._hamiltonian_search("backtrack", True, timeout, max_expansions, precheck, ordering, should_stop)
+
+    def _hamiltonian_search(self, method, path, timeout, max_expansions, precheck, ordering, should_stop,
+                            workers=None, split_depth=2):
+        if ordering not in SEARCH_ORDERINGS:
+            raise ValueError(f"Unknown search ordering '{ordering}'. Expected one of {SEARCH_ORDERINGS}.")
+        kind = "path" if path else "cycle"
+        start_t = time.perf_counter()
+        cache_key = None
+        if self.result_cache is not None:
+            cache_key = self.graph_key() + ("path",) if path else self.graph_key()
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                found, stats = cached
+                self.last_search_stats = dict(stats, cached=True, elapsed=time.perf_counter() - start_t)
+                if found is None:
+                    logger.info(f"No Hamiltonian {kind} found in the graph (cached result).")
+                    return None
+                return list(found)
+        budget = SearchBudget(timeout=timeout, max_expansions=max_expansions, should_stop=should_stop)
+        certificate = None
+        if precheck and self.num_nodes >= 3:
+            with phase(self.instrumentation, "precheck"):
+                certificate = (hamiltonian_path_obstruction if path else hamiltonian_obstruction)(self.csr())
+        if certificate is not None:
+            logger.info(f"No Hamiltonian {kind}: {describe_obstruction(certificate)}.")
+            found = None
+        elif path:
+            found = self._find_hamiltonian_path(budget, ordering)
+        else:
+            found = self._find_hamiltonian_cycle(method, workers, split_depth, budget, ordering)
+        if found:
+            status = "found"
+        elif budget.exhausted:
+            status = "unknown"
+            found = BUDGET_EXHAUSTED
+        else:
+            status = "none"
+        self.last_search_stats = budget.as_dict()
+        self.last_search_stats.update({'method': method, 'ordering': ordering, 'status': status,
+                                       'elapsed': time.perf_counter() - start_t})
+        if path:
+            self.last_search_stats['kind'] = kind
+        if certificate is not None:
+            self.last_search_stats['certificate'] = certificate
+        if cache_key is not None and status != "unknown": # Budget cut-offs prove nothing
+            self.result_cache.put(cache_key, found, self.last_search_stats)
+        if self.instrumentation is not None:
+            self.instrumentation.count('expansions', budget.nodes_expanded)
+            self.instrumentation.count('backtracks', budget.backtracks)
+            self.instrumentation.count('prunes', budget.prunes)
+        return found
+
+    def _find_hamiltonian_cycle(self, method, workers, split_depth, budget, ordering):
         if not self.graph and self.num_nodes > 0: # Graph with nodes but no edges
-            print(f"Graph has {self.num_nodes} nodes but no edges. Cannot find Hamiltonian cycle.")
+            logger.info(f"Graph has {self.num_nodes} nodes but no edges. Cannot find Hamiltonian cycle.")
             return None
         if not self.graph:
-            print("Graph is empty. Cannot find Hamiltonian cycle.")
+            logger.info("Graph is empty. Cannot find Hamiltonian cycle.")
             return None
         if self.num_nodes == 0:
-            print("Number of nodes (self.num_nodes) is 0. Cannot determine cycle parameters.")
+            logger.info("Number of nodes (self.num_nodes) is 0. Cannot determine cycle parameters.")
             return None
         if self.num_nodes < 1: # Pathological cases
-             print(f"Number of nodes {self.num_nodes} is too small for a typical cycle search.")
+             logger.info(f"Number of nodes {self.num_nodes} is too small for a typical cycle search.")
              return None
         # Standard Hamiltonian cycle definition often requires N >= 3.
         # This algorithm might find A-B-A for N=2.
 
-        path = [] 
-        visited = {i: False for i in range(1, self.num_nodes + 1)}
-        
         # Try to find a valid starting node that is part of the graph and within the expected node range
         start_node = -1
         # Prefer to start from node 1 if it exists and has edges, or just exists.
         potential_starts = [n for n in range(1, self.num_nodes + 1) if n in self.graph]
         if not potential_starts: # No nodes from 1..num_nodes are in graph.keys() (e.g. empty graph)
             # Or if self.graph contains nodes outside 1..num_nodes range, which shouldn't happen with current generation
-            print("No valid starting node found (e.g., graph empty or nodes outside expected range 1..num_nodes).")
+            logger.info("No valid starting node found (e.g., graph empty or nodes outside expected range 1..num_nodes).")
             return None
 
         # Pick the first available node from the expected range as a starting point.
         # Sorting potential_starts makes the choice deterministic if multiple options exist.
         start_node = sorted(potential_starts)[0]
-        
-        if self._hamiltonian_cycle_util(start_node, path, visited, start_node):
-            return path
-        else:
-            print(f"No Hamiltonian cycle found in the graph (search started from node {start_node}).")
+
+        rows = None
+        if method != "backtrack": # The backtracker walks the CSR rows instead
+            rows = self._search_input("rows", self._encode_rows)
+
+        with phase(self.instrumentation, "search"):
+            if ordering == "random" and method != "dp":
+                cycle = self._random_restart_search(
+                    lambda restart, order: self._ordered_search(method, rows, start_node, restart, order, False), budget)
+            else:
+                # dp is exhaustive: the order cannot change its result, so it gets the numeric one
+                static = "numeric" if method == "dp" else ordering
+                cycle = self._ordered_search(method, rows, start_node, budget, self._static_order(static),
+                                             ordering == "warnsdorff", workers, split_depth, static)
+        if cycle:
+            return cycle
+        if budget.exhausted:
+            logger.info(f"Hamiltonian search stopped early ({budget.exhausted}) after {budget.nodes_expanded} expansions; result unknown.")
             return None
+        logger.info(f"No Hamiltonian cycle found in the graph (search started from node {start_node}).")
+        return None
     
-    def export_to_tikz(self, filename=None):
+    def _encode_rows(self):
+        with phase(self.instrumentation, "encode"):
+            return to_bitmask_rows(self.graph, self.num_nodes)
+
+    def _static_order(self, ordering):
+        return self._search_input(("order", ordering), lambda: vertex_order(self.graph, self.num_nodes, ordering))
+
+    def _ranked_neighbours(self, order, ordering=None):
+        # CSR rows sorted by order; cached when order is the static ordering of that name (not a random restart)
+        csr = self.csr()
+        build = lambda: ranked_neighbours(csr.offsets, csr.neighbours, order)
+        return build() if ordering is None else self._search_input(("ranked", ordering), build)
+
+    def _ordered_search(self, method, rows, start_node, budget, order, warnsdorff, workers=None, split_depth=2,
+                        ordering=None):
+        # One search with vertices tried in the given priority order; ordering names it when it is a
+        # static one, so the inputs derived from it are cached
+        if method == "dp":
+            return held_karp_hamiltonian_cycle(rows, self.num_nodes, start_node, budget=budget)
+        if method == "backtrack":
+            return backtrack_hamiltonian(self.csr().offsets, self._ranked_neighbours(order, ordering),
+                                         self.num_nodes, [start_node], budget=budget, warnsdorff=warnsdorff)
+
+        # The bitmask engines try the lowest id first: relabel so that this follows the order
+        new_to_old = None
+        if order != sorted(order):
+            build = lambda: relabel_rows(rows, order)
+            rows, new_to_old = build() if ordering is None else self._search_input(("relabelled", ordering), build)
+            start_node = order.index(start_node) + 1
+        if method == "parallel":
+            cycle = parallel_hamiltonian_cycle(rows, self.num_nodes, start_node,
+                                               workers=workers, split_depth=split_depth, budget=budget)
+        else:
+            cycle = bitset_hamiltonian_cycle(rows, self.num_nodes, start_node, budget=budget, warnsdorff=warnsdorff)
+        if cycle and new_to_old is not None:
+            cycle = [new_to_old[v] for v in cycle]
+        return cycle
+
+    def _find_hamiltonian_path(self, budget, ordering):
         if self.num_nodes == 0:
-            if filename:
-                with open(filename, 'w') as f:
-                    f.write("% Graph is empty or not generated (0 nodes).\n\\begin{tikzpicture}\n\\node at (0,0) {Empty Graph (0 nodes)};\n\\end{tikzpicture}")
-                print(f"Empty graph TikZ placeholder saved to {filename}")
-            return "% Graph is empty (0 nodes).\n\\begin{tikzpicture}\n\\node at (0,0) {Empty Graph (0 nodes)};\n\\end{tikzpicture}"
-
-        angle_step = 360 / self.num_nodes if self.num_nodes > 0 else 0
-        node_positions = {}
-        for i in range(1, self.num_nodes + 1): # Assumes nodes are 1 to num_nodes
-            angle = (i - 1) * angle_step
-            # Avoid exact overlap for small num_nodes if radius is tiny
-            radius = max(0.5, 0.5 * self.num_nodes / (math.pi)) # Basic scaling for radius
-            radius = min(radius, 5) # Cap radius
-            if self.num_nodes == 1: radius = 0 # Place single node at origin
-
-            x = round(radius * math.cos(math.radians(angle)), 2)
-            y = round(radius * math.sin(math.radians(angle)), 2)
-            node_positions[i] = (x, y)
-        
-        tikz_code = "\\begin{tikzpicture}[scale=1.0, every node/.style={circle, draw, fill=white!90!blue, minimum size=8pt, inner sep=1pt}]\n"
-        
-        drawn_edges = set()
-        # Iterate through graph keys, but ensure positions are available from node_positions
-        sorted_graph_nodes = sorted(self.graph.keys())
-
-        for u_node in sorted_graph_nodes:
-            if u_node not in node_positions: continue # Skip drawing edges for nodes not in 1..num_nodes range
-            for v_node in sorted(self.graph[u_node]):
-                if v_node not in node_positions: continue
-
-                # Use tuple(sorted(...)) for undirected edges in drawn_edges set
-                edge_pair = tuple(sorted((u_node, v_node)))
-                if edge_pair not in drawn_edges:
-                    x1, y1 = node_positions[u_node]
-                    x2, y2 = node_positions[v_node]
-                    tikz_code += f"    \\draw ({x1:.2f},{y1:.2f}) -- ({x2:.2f},{y2:.2f});\n"
-                    drawn_edges.add(edge_pair)
-        
-        # Draw nodes based on node_positions (1 to num_nodes)
-        for node_id, (x, y) in node_positions.items():
-            # Only draw if node_id is actually part of the graph structure (has key or is target node count)
-            # This ensures even isolated nodes within 1..num_nodes are drawn.
-             tikz_code += f"    \\node at ({x:.2f},{y:.2f}) ({node_id}) {{{node_id}}};\n"
-    
-        tikz_code += "\\end{tikzpicture}"
-        
+            logger.info("Graph is empty. Cannot find Hamiltonian path.")
+            return None
+        csr = self.csr()
+        offsets = csr.offsets
+        # A degree-1 vertex has to be an end of the path, so with one the search starts there only
+        leaves = [u for u in range(1, self.num_nodes + 1) if offsets[u + 1] - offsets[u] == 1]
+
+        def search(search_budget, order, static=None):
+            starts = leaves[:1] or order
+            return backtrack_hamiltonian(offsets, self._ranked_neighbours(order, static), self.num_nodes,
+                                         starts, cycle=False, budget=search_budget, warnsdorff=ordering == "warnsdorff")
+
+        with phase(self.instrumentation, "search"):
+            if ordering == "random":
+                path = self._random_restart_search(search, budget)
+            else:
+                path = search(budget, self._static_order(ordering), ordering)
+        if path:
+            return path
+        if budget.exhausted:
+            logger.info(f"Hamiltonian path search stopped early ({budget.exhausted}) after {budget.nodes_expanded} expansions; result unknown.")
+            return None
+        logger.info("No Hamiltonian path found in the graph.")
+        return None
+
+    def _random_restart_search(self, search, budget):
+        # Shuffled orders, restarted after RESTART_UNIT * luby(i) expansions. The cap keeps growing,
+        # so the search stays complete; a restart that finishes inside its cap decides the graph.
+        # search(restart_budget, order) runs one attempt.
+        rng = random.Random(self.graph.edge_hash) # Same graph, same restart sequence
+        attempt = 0
+        while True:
+            attempt += 1
+            cap = RESTART_UNIT * luby(attempt)
+            if budget.max_expansions is not None:
+                cap = min(cap, budget.max_expansions - budget.nodes_expanded)
+            restart = SearchBudget(max_expansions=cap, should_stop=budget.should_stop)
+            restart.deadline = budget.deadline
+            order = vertex_order(self.graph, self.num_nodes, "random", rng)
+            cycle = search(restart, order)
+            budget.record(restart.nodes_expanded, restart.max_depth, restart.prunes, restart.backtracks)
+            if cycle or restart.exhausted is None:
+                return cycle
+            if restart.exhausted != "max_expansions" or budget.spent(budget.nodes_expanded):
+                budget.exhausted = budget.exhausted or restart.exhausted
+                return None
+
+    def _tikz_positions(self):
+        # Coordinates are formatted once per node; every edge line then just joins two strings
+        # Same arithmetic as the original exporter (angle in degrees, rounded before formatting), so the
+        # coordinates match it to the last character, -0.00 included
+        angle_step = 360 / self.num_nodes
+        radius = max(0.5, 0.5 * self.num_nodes / (math.pi)) # Basic scaling for radius
+        radius = min(radius, 5) # Cap radius
+        if self.num_nodes == 1: radius = 0 # Place single node at origin
+        positions = [""] # Index 0 unused: node ids are 1..num_nodes
+        for k in range(self.num_nodes):
+            angle = math.radians(k * angle_step)
+            positions.append(f"({round(radius * math.cos(angle), 2):.2f},{round(radius * math.sin(angle), 2):.2f})")
+        return positions
+
+    def _upper_neighbours(self, u_node):
+        # Sorted neighbours v >= u_node, so each undirected edge (a loop included) is emitted exactly once
+        if isinstance(self.graph, CSRAdjacency):
+            lo, hi = self.graph.offsets[u_node], self.graph.offsets[u_node + 1]
+            start = bisect_left(self.graph.neighbours, u_node, lo, hi)
+            return self.graph.neighbours[start:hi]
+        return sorted(v for v in self.graph.get(u_node, ()) if v >= u_node)
+
+    def iter_tikz_lines(self):
+        """Yields the TikZ document line by line."""
+        if self.num_nodes == 0:
+            yield "% Graph is empty (0 nodes).\n\\begin{tikzpicture}\n\\node at (0,0) {Empty Graph (0 nodes)};\n\\end{tikzpicture}"
+            return
+
+        positions = self._tikz_positions()
+        yield "\\begin{tikzpicture}[scale=1.0, every node/.style={circle, draw, fill=white!90!blue, minimum size=8pt, inner sep=1pt}]\n"
+        for u_node in range(1, self.num_nodes + 1):
+            if u_node not in self.graph: continue
+            start = positions[u_node]
+            for v_node in self._upper_neighbours(u_node):
+                if v_node > self.num_nodes: continue # Skip nodes outside the 1..num_nodes range
+                yield f"    \\draw {start} -- {positions[v_node]};\n"
+        # Draw nodes 1..num_nodes, so isolated nodes show up as well
+        for node_id in range(1, self.num_nodes + 1):
+            yield f"    \\node at {positions[node_id]} ({node_id}) {{{node_id}}};\n"
+        yield "\\end{tikzpicture}"
+
+    def write_tikz(self, file_obj):
+        # Streams the document into an open text file without building it in memory
+        file_obj.writelines(self.iter_tikz_lines())
+
+    def export_to_tikz(self, filename=None):
+        # Returns the document and, with a filename, also saves it there; write_tikz streams a large
+        # graph to a file without building the string
+        tikz_code = "".join(self.iter_tikz_lines())
         if filename:
             with open(filename, 'w') as f:
-                f.write(tikz_code)
-            print(f"TikZ code saved to {filename}")
-        return tikz_code
\ No newline at end of file
+                if self.num_nodes == 0:
+                    f.write("% Graph is empty or not generated (0 nodes).\n\\begin{tikzpicture}\n\\node at (0,0) {Empty Graph (0 nodes)};\n\\end{tikzpicture}")
+                else:
+                    f.write(tikz_code)
+            if self.num_nodes == 0:
+                logger.info(f"Empty graph TikZ placeholder saved to {filename}")
+            else:
+                logger.info(f"TikZ code saved to {filename}")
+        return tikz_code
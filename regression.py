@@ -0,0 +1,358 @@
+import io
+import json
+import os
+import platform
+import time
+from collections import deque
+
+from adjacency import CSRAdjacency
+from benchmark import _quiet_algorithms
+from corpus import generate_graph, EULERIZED_SUFFIX
+from hamiltonian_engines import BUDGET_EXHAUSTED
+from operations_on_graf import GraphGenerator
+
+DEFAULT_BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "regression_baselines.json")
+# A case fails once its machine-normalised time exceeds the baseline by more than this fraction
+DEFAULT_THRESHOLD = 0.3
+# Timed samples per case; the fastest one counts, which filters out scheduler noise
+REGRESSION_REPEAT = 5
+
+
+def _calibration_workload():
+    # Fixed pure-Python work in the style of the graph code: integer arithmetic, list indexing and
+    # dict/set updates, so interpreter and CPU speed cancel out of the normalised times
+    table = {}
+    seen = set()
+    values = list(range(4096))
+    total = 0
+    for i in range(200000):
+        total += (i * 2654435761) & 1023
+        values[i & 4095] ^= total
+        table[i & 2047] = total
+        if total & 7 == 0:
+            seen.add(i & 8191)
+    return total + len(seen)
+
+
+def calibrate(repeat=REGRESSION_REPEAT):
+    """Seconds the reference workload takes on this machine (fastest of repeat runs)."""
+    return _best_time(_calibration_workload, 1, repeat)[0]
+
+
+def _best_time(run, number, repeat):
+    # (fastest seconds per call over repeat samples of number calls, result of the last call)
+    best = None
+    result = None
+    for _ in range(repeat):
+        start_t = time.perf_counter()
+        for _ in range(number):
+            result = run()
+        elapsed = (time.perf_counter() - start_t) / number
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+# Correctness oracles: each returns a description of the first problem found, or None
+
+def graph_problem(generator):
+    """Checks the adjacency itself: ids in range, no loops, symmetric rows and a matching edge count."""
+    graph, num_nodes = generator.graph, generator.num_nodes
+    half_edges = 0
+    for u in range(1, num_nodes + 1):
+        for v in graph.get(u, ()):
+            if not 1 <= v <= num_nodes or v == u:
+                return f"bad neighbour {v} of vertex {u}"
+            if not graph.has_edge(v, u):
+                return f"edge {u}-{v} is missing from the row of {v}"
+            half_edges += 1
+    if half_edges != 2 * graph.num_edges:
+        return f"num_edges is {graph.num_edges}, the rows hold {half_edges // 2} edges"
+    return None
+
+
+def _edge_set(generator):
+    return {(u, v) for u in range(1, generator.num_nodes + 1) for v in generator.graph.get(u, ()) if u < v}
+
+
+def eulerian_problem(generator, is_eulerian):
+    """Compares is_eulerian() with degrees and connectivity recomputed from the rows."""
+    graph, num_nodes = generator.graph, generator.num_nodes
+    with_edges = [u for u in range(1, num_nodes + 1) if graph.degree(u)]
+    expected = bool(with_edges) and all(graph.degree(u) % 2 == 0 for u in with_edges)
+    if expected: # Every vertex with edges has to be reachable from the first one
+        reached = {with_edges[0]}
+        queue = deque(reached)
+        while queue:
+            for v in graph.get(queue.popleft(), ()):
+                if v not in reached:
+                    reached.add(v)
+                    queue.append(v)
+        expected = len(reached) == len(with_edges)
+    if is_eulerian != expected:
+        return f"is_eulerian() returned {is_eulerian}, expected {expected}"
+    return None
+
+
+def eulerian_trail_problem(generator, trail, closed=True):
+    """Checks that trail walks every edge exactly once (and returns to its start when closed)."""
+    edges = _edge_set(generator)
+    if not trail:
+        return "no Eulerian trail returned" if edges else None
+    if closed and trail[0] != trail[-1]:
+        return "the Eulerian cycle is not closed"
+    if len(trail) != len(edges) + 1:
+        return f"the trail has {len(trail) - 1} steps for {len(edges)} edges"
+    walked = set()
+    for u, v in zip(trail, trail[1:]):
+        edge = (min(u, v), max(u, v))
+        if edge not in edges:
+            return f"the trail uses {u}-{v}, which is not an edge"
+        if edge in walked:
+            return f"the trail uses edge {u}-{v} twice"
+        walked.add(edge)
+    return None
+
+
+def hamiltonian_problem(generator, result, expected, closed=True):
+    """Checks a Hamiltonian cycle (closed) or path against the graph and the expected answer.
+
+    expected is True when the graph is known to have one (a planted cycle) and False when it is
+    known not to (an isolated vertex); a search cut short by its budget is always a problem.
+    """
+    kind = "cycle" if closed else "path"
+    if result is BUDGET_EXHAUSTED:
+        return f"the Hamiltonian {kind} search ran out of budget"
+    if not result:
+        return f"no Hamiltonian {kind} found, but the graph has one" if expected else None
+    if not expected:
+        return f"a Hamiltonian {kind} was returned for a graph without one"
+    num_nodes = generator.num_nodes
+    vertices = result[:-1] if closed else result
+    if closed and result[0] != result[-1]:
+        return "the Hamiltonian cycle is not closed"
+    if sorted(vertices) != list(range(1, num_nodes + 1)):
+        return f"the Hamiltonian {kind} does not visit every vertex exactly once"
+    for u, v in zip(result, result[1:]):
+        if not generator.graph.has_edge(u, v):
+            return f"the Hamiltonian {kind} uses {u}-{v}, which is not an edge"
+    return None
+
+
+def csr_problem(generator, csr):
+    """Checks a CSR copy row by row against the graph it was built from, and its edge ids."""
+    graph, num_nodes = generator.graph, generator.num_nodes
+    if csr.num_edges != graph.num_edges:
+        return f"the CSR form has {csr.num_edges} edges, the graph {graph.num_edges}"
+    ids = {}
+    for u in range(1, num_nodes + 1):
+        start, end = csr.offsets[u], csr.offsets[u + 1]
+        if sorted(csr.neighbours[start:end]) != sorted(graph.get(u, ())):
+            return f"the CSR row of vertex {u} differs from the graph"
+        for v, edge_id in zip(csr.neighbours[start:end], csr.edge_ids[start:end]):
+            if ids.setdefault((min(u, v), max(u, v)), edge_id) != edge_id:
+                return f"the two half-edges of {u}-{v} have different edge ids"
+    if sorted(ids.values()) != list(range(graph.num_edges)):
+        return "the edge ids are not numbered 0..num_edges-1"
+    return None
+
+
+def tikz_problem(generator, document):
+    """Checks the exported document: one \\draw per edge, one \\node per vertex, closed environment."""
+    lines = document.splitlines()
+    draws = sum(1 for line in lines if line.lstrip().startswith("\\draw"))
+    nodes = sum(1 for line in lines if line.lstrip().startswith("\\node"))
+    if draws != generator.graph.num_edges or nodes != generator.num_nodes:
+        return f"{draws} edges and {nodes} nodes drawn, expected {generator.graph.num_edges} and {generator.num_nodes}"
+    if lines[-1] != "\\end{tikzpicture}":
+        return "the tikzpicture environment is not closed"
+    return None
+
+
+# Cases: name -> (setup, calls per timed sample). setup() builds the (untimed) seeded graph and
+# returns (run, check): run is timed, check(result of the last run) applies the oracles. backend
+# picks the adjacency the graph is generated into (see GraphGenerator)
+
+def _graph(kind, n, saturation, seed, backend="set"):
+    return generate_graph((kind, n, saturation, seed), GraphGenerator(backend))
+
+
+def _generation_case(kind, n, saturation, seed, backend="set"):
+    def setup():
+        def run():
+            return _graph(kind, n, saturation, seed, backend)
+
+        def check(generator):
+            problem = graph_problem(generator)
+            if problem is None and generator.num_nodes != n:
+                problem = f"generated {generator.num_nodes} vertices instead of {n}"
+            if problem is None and kind.endswith(EULERIZED_SUFFIX) and generator.graph.odd_degree_count:
+                problem = "the eulerized graph has odd-degree vertices"
+            return problem
+        return run, check
+    return setup
+
+
+def _is_eulerian_case(kind, n, saturation, seed):
+    def setup():
+        generator = generate_graph((kind, n, saturation, seed))
+        return generator.is_eulerian, lambda result: eulerian_problem(generator, result)
+    return setup
+
+
+def _eulerian_case(kind, n, saturation, seed, closed=True, backend="set"):
+    def setup():
+        generator = _graph(kind, n, saturation, seed, backend)
+        run = generator.find_eulerian_cycle if closed else generator.find_eulerian_path
+        return run, lambda trail: eulerian_trail_problem(generator, trail, closed)
+    return setup
+
+
+def _hamiltonian_case(kind, n, saturation, seed, closed=True, backend="set", **search_options):
+    def setup():
+        generator = _graph(kind, n, saturation, seed, backend)
+        expected = not kind.startswith("non_hamiltonian")
+
+        def run():
+            if closed:
+                return generator.find_hamiltonian_cycle(**search_options)
+            return generator.find_hamiltonian_path(**search_options)
+        return run, lambda result: hamiltonian_problem(generator, result, expected, closed)
+    return setup
+
+
+def _csr_build_case(kind, n, saturation, seed, backend="set"):
+    # The traversals reuse the cached CSR form after the warm-up, so its O(m) build is timed here
+    def setup():
+        generator = _graph(kind, n, saturation, seed, backend)
+
+        def run():
+            return CSRAdjacency.from_mapping(generator.graph, generator.num_nodes)
+        return run, lambda csr: csr_problem(generator, csr)
+    return setup
+
+
+def _tikz_case(kind, n, saturation, seed):
+    def setup():
+        generator = generate_graph((kind, n, saturation, seed))
+
+        def run():
+            document = io.StringIO()
+            generator.write_tikz(document) # What export_to_tikz streams to its file
+            return document.getvalue()
+        return run, lambda document: tikz_problem(generator, document)
+    return setup
+
+
+REGRESSION_CASES = {
+    'generate_hamiltonian_n300_s30': (_generation_case("hamiltonian", 300, 30, 1), 1),
+    'generate_hamiltonian_n300_s70': (_generation_case("hamiltonian", 300, 70, 2), 1),
+    'generate_non_hamiltonian_n200': (_generation_case("non_hamiltonian", 200, 70, 3), 1),
+    'generate_eulerized_n200_s30': (_generation_case("hamiltonian" + EULERIZED_SUFFIX, 200, 30, 4), 1),
+    'is_eulerian_n300': (_is_eulerian_case("hamiltonian" + EULERIZED_SUFFIX, 300, 70, 5), 20000),
+    'eulerian_cycle_n300_s70': (_eulerian_case("hamiltonian" + EULERIZED_SUFFIX, 300, 70, 6), 1),
+    'eulerian_path_n300_s30': (_eulerian_case("hamiltonian" + EULERIZED_SUFFIX, 300, 30, 7, closed=False), 1),
+    'hamiltonian_backtrack_n500_s70': (_hamiltonian_case("hamiltonian", 500, 70, 8, method="backtrack"), 1),
+    'hamiltonian_backtrack_warnsdorff_n200_s30': (_hamiltonian_case("hamiltonian", 200, 30, 9, method="backtrack",
+                                                                    ordering="warnsdorff"), 1),
+    'hamiltonian_bitset_n40_s30': (_hamiltonian_case("hamiltonian", 40, 30, 10, method="bitset"), 20),
+    'hamiltonian_dp_n16_s30': (_hamiltonian_case("hamiltonian", 16, 30, 11, method="dp"), 1),
+    'hamiltonian_backtrack_exhaustive_n12': (_hamiltonian_case("non_hamiltonian", 12, 70, 12, method="backtrack",
+                                                               precheck=False), 1),
+    'hamiltonian_precheck_n300': (_hamiltonian_case("non_hamiltonian", 300, 70, 14, method="backtrack"), 500),
+    'hamiltonian_path_n300_s30': (_hamiltonian_case("hamiltonian", 300, 30, 15, closed=False), 1),
+    'tikz_n300_s70': (_tikz_case("hamiltonian", 300, 70, 16), 1),
+    'csr_build_n300_s70': (_csr_build_case("hamiltonian", 300, 70, 17), 1),
+    'csr_build_dense_n300_s70': (_csr_build_case("hamiltonian", 300, 70, 18, backend="dense"), 1),
+    'generate_dense_n300_s70': (_generation_case("hamiltonian", 300, 70, 19, backend="dense"), 1),
+    'generate_csr_n300_s30': (_generation_case("hamiltonian", 300, 30, 20, backend="csr"), 1),
+    'eulerian_cycle_csr_n300_s70': (_eulerian_case("hamiltonian" + EULERIZED_SUFFIX, 300, 70, 21, backend="csr"), 1),
+    'eulerian_cycle_dense_n300_s70': (_eulerian_case("hamiltonian" + EULERIZED_SUFFIX, 300, 70, 22,
+                                                     backend="dense"), 1),
+    'hamiltonian_backtrack_dense_n200_s30': (_hamiltonian_case("hamiltonian", 200, 30, 23, backend="dense",
+                                                               method="backtrack"), 1),
+    'hamiltonian_bitset_csr_n40_s30': (_hamiltonian_case("hamiltonian", 40, 30, 24, backend="csr", method="bitset"), 20),
+    'hamiltonian_parallel_n40_s30': (_hamiltonian_case("hamiltonian", 40, 30, 25, method="parallel", workers=2), 1),
+    'hamiltonian_backtrack_random_n200_s30': (_hamiltonian_case("hamiltonian", 200, 30, 26, method="backtrack",
+                                                                ordering="random"), 1),
+    'hamiltonian_bitset_random_n40_s30': (_hamiltonian_case("hamiltonian", 40, 30, 27, method="bitset",
+                                                            ordering="random"), 20),
+    'hamiltonian_dp_random_n16_s30': (_hamiltonian_case("hamiltonian", 16, 30, 28, method="dp", ordering="random"), 1),
+    'hamiltonian_path_random_n300_s30': (_hamiltonian_case("hamiltonian", 300, 30, 29, closed=False,
+                                                           ordering="random"), 1),
+}
+
+
+def load_baselines(path=DEFAULT_BASELINES):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get('cases', {})
+
+
+def save_baselines(results, path=DEFAULT_BASELINES):
+    with open(path, 'w') as f:
+        json.dump({'python': platform.python_version(), 'machine': platform.machine(),
+                   'cases': {name: float(f"{row['normalised']:.4g}") for name, row in results.items()}},
+                  f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def run_case(name, repeat=REGRESSION_REPEAT):
+    """Times one case (fastest of repeat samples) and applies its oracle: (seconds, problem or None)."""
+    setup, number = REGRESSION_CASES[name]
+    with _quiet_algorithms():
+        run, check = setup()
+        run() # Warm-up; it caches the CSR form the traversals share, whose build the csr_build cases time
+        seconds, result = _best_time(run, number, repeat)
+        problem = check(result)
+    return seconds, problem
+
+
+def run_regression(names=None, baselines_path=DEFAULT_BASELINES, threshold=DEFAULT_THRESHOLD,
+                   update=False, repeat=REGRESSION_REPEAT):
+    """Runs the regression cases against the stored baselines and prints one line per case.
+
+    Times are divided by calibrate() so baselines transfer between machines; a case fails when
+    its oracle reports a problem or its normalised time exceeds the baseline by more than
+    threshold. With update, the baselines file is rewritten instead (only if every oracle passes).
+    Returns the names of the failed cases.
+    """
+    names = list(names or REGRESSION_CASES)
+    for name in names:
+        if name not in REGRESSION_CASES:
+            raise ValueError(f"Unknown regression case '{name}'. Expected one of {tuple(REGRESSION_CASES)}.")
+    baselines = load_baselines(baselines_path)
+    calibration = calibrate(repeat)
+    print(f"Calibration workload: {calibration:.4f}s")
+    results = {}
+    failures = []
+    for name in names:
+        try:
+            seconds, problem = run_case(name, repeat)
+        except ImportError as e: # The dense cases need NumPy
+            print(f"  {name:<44} skipped: {e}")
+            continue
+        normalised = seconds / calibration
+        baseline = baselines.get(name)
+        if problem is not None:
+            verdict = f"WRONG: {problem}"
+            failures.append(name)
+        elif update or baseline is None:
+            verdict = "new baseline" if update else "no baseline"
+        elif normalised > baseline * (1 + threshold):
+            verdict = f"SLOWER than baseline {baseline:.4g} by {normalised / baseline - 1:.0%}"
+            failures.append(name)
+        else:
+            verdict = f"ok ({normalised / baseline:.2f}x baseline)"
+        results[name] = {'seconds': seconds, 'normalised': normalised}
+        print(f"  {name:<44} {seconds * 1e3:10.4f}ms  normalised {normalised:.4g}  {verdict}")
+    if update:
+        if failures:
+            print("Baselines not updated: some results are wrong.")
+        else:
+            if set(results) != set(REGRESSION_CASES): # Keep the baselines of the cases not run
+                results = dict({name: {'normalised': value} for name, value in baselines.items()}, **results)
+            save_baselines(results, baselines_path)
+            print(f"Baselines saved to {baselines_path}")
+    print(f"{len(results) - len(failures)}/{len(results)} cases passed.")
+    return failures
@@ -0,0 +1,92 @@
+import json
+import os
+import sys
+from collections import OrderedDict
+
+# Rough per-entry overhead (key tuple, stats dict, bookkeeping) on top of the cycle list
+_ENTRY_OVERHEAD = 1024
+
+
+def _entry_size(cycle):
+    return _ENTRY_OVERHEAD + (sys.getsizeof(cycle) + 28 * len(cycle) if cycle else 0)
+
+
+class HamiltonianResultCache:
+    """Memoized Hamiltonian search results, keyed by GraphGenerator.graph_key().
+
+    Only decided results are kept: the cycle, or None for a graph proven to have none, each
+    with the statistics of the search that decided it. Entries are evicted least recently used
+    first once their estimated size passes max_bytes. With a path, every new entry is also
+    appended to a JSON-lines file there, which is read back on construction, so expensive
+    negative proofs survive across runs.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, path=None):
+        self.max_bytes = max_bytes
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        if path and os.path.exists(path):
+            self._load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        """(cycle or None, stats) for a cached graph, or None on a miss."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, cycle, stats):
+        self._store(key, list(cycle) if cycle else None, dict(stats))
+        if self.path:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps({'key': list(key), 'cycle': self._entries[key][0], 'stats': stats}) + "\n")
+
+    def _store(self, key, cycle, stats):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= _entry_size(old[0])
+        self._entries[key] = (cycle, stats)
+        self._bytes += _entry_size(cycle)
+        while self.max_bytes is not None and self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self._bytes -= _entry_size(evicted)
+
+    def _load(self):
+        # Later lines win; a torn last line (interrupted run) is skipped
+        lines = 0
+        with open(self.path) as f:
+            for line in f:
+                lines += 1
+                try:
+                    record = json.loads(line)
+                    self._store(tuple(record['key']), record['cycle'], record['stats'])
+                except (ValueError, KeyError, TypeError):
+                    continue
+        if lines > len(self._entries): # Drop overwritten, evicted and broken lines from the file
+            self.compact()
+
+    def compact(self):
+        """Rewrites the persistence file with just the entries currently held."""
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            for key, (cycle, stats) in self._entries.items():
+                f.write(json.dumps({'key': list(key), 'cycle': cycle, 'stats': stats}) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
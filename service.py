@@ -0,0 +1,224 @@
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from batch import execute_job
+
+log = logging.getLogger(__name__)
+
+# Per-process cancellation flags, one slot per in-flight request, installed by the pool initializer
+_cancel_flags = None
+
+
+def _init_service_worker(cancel_flags):
+    global _cancel_flags
+    _cancel_flags = cancel_flags
+
+
+def _service_job(job, slot):
+    def should_stop():
+        return _cancel_flags[slot] != 0
+
+    if should_stop(): # Cancelled while queued
+        return {'id': job.get("id"), 'cancelled': True}
+    record = execute_job(job, should_stop=should_stop)
+    if should_stop():
+        record['cancelled'] = True
+    return record
+
+
+class _Connection:
+    # Per-client state: outstanding requests under connection-local keys (ids may repeat or be
+    # missing), their tasks, and how many of them still wait for room in the pool
+    def __init__(self, writer, max_waiting):
+        self.writer = writer
+        self.write_lock = asyncio.Lock()
+        self.requests = {} # Key -> [request id, slot, concurrent future]; slot and future are None while waiting
+        self.tasks = {} # Key -> asyncio task running the request
+        self.keys = itertools.count()
+        self.waiting = 0
+        self.max_waiting = max_waiting
+        self.readable = asyncio.Event() # Cleared while max_waiting jobs wait, which pauses reading
+        self.readable.set()
+        self.gone = False # Set once writing to the client failed
+
+
+class GraphService:
+    """asyncio front end that runs batch-style jobs in a bounded process pool.
+
+    Clients send one JSON job per line (the format of batch.run_batch; "id" names the request)
+    and get one JSON result record per line, in completion order. {"cancel": <id>} cancels the
+    requests with that id on the same connection: a queued job is dropped, a running search stops
+    at its next budget poll. At most max_pending jobs hold a pool slot; later jobs wait for one,
+    and once max_pending jobs of a connection are waiting the server stops reading from it, so
+    clients feel backpressure instead of the queue growing. Control lines are read whenever the
+    connection is. A client that half-closes still gets its results; once writing to a client
+    fails, its outstanding requests are cancelled.
+    """
+
+    def __init__(self, workers=None, max_pending=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 4
+        self._cancel_flags = multiprocessing.Array('b', self.max_pending, lock=False)
+        self._free_slots = list(range(self.max_pending))
+        self._capacity = None
+        self._executor = None
+
+    async def serve(self, address):
+        """Serves on "host:port" or "unix:/path/to/socket" until cancelled."""
+        self._capacity = asyncio.Semaphore(self.max_pending)
+        self._executor = self._new_executor()
+        try:
+            if address.startswith("unix:"):
+                server = await asyncio.start_unix_server(self._handle_connection, path=address[5:])
+            else:
+                host, _, port = address.rpartition(':')
+                server = await asyncio.start_server(self._handle_connection, host or "127.0.0.1", int(port))
+            log.info("Graph service listening on %s (%d workers, %d requests in flight)",
+                     address, self.workers, self.max_pending)
+            async with server:
+                await server.serve_forever()
+        finally:
+            self._executor.shutdown(cancel_futures=True)
+
+    def _new_executor(self):
+        # Spawned, not forked: a forked worker would inherit the open client sockets, and a client
+        # whose socket a worker still holds never sees EOF after writer.close()
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_service_worker, initargs=(self._cancel_flags,))
+
+    def _submit(self, job, slot):
+        executor = self._executor
+        try:
+            return executor.submit(_service_job, job, slot)
+        except BrokenProcessPool: # A worker died: its jobs failed, later ones go to a fresh pool
+            if self._executor is executor:
+                executor.shutdown(wait=False)
+                self._executor = self._new_executor()
+            return self._executor.submit(_service_job, job, slot)
+
+    async def _handle_connection(self, reader, writer):
+        connection = _Connection(writer, self.max_pending)
+        try:
+            while not connection.gone:
+                await connection.readable.wait()
+                try:
+                    line = await reader.readline()
+                except ConnectionError:
+                    connection.gone = True
+                    break
+                if not line: # EOF may be a half-close: keep answering what was sent
+                    break
+                try:
+                    job = json.loads(line)
+                    if not isinstance(job, dict):
+                        raise ValueError("request must be a JSON object")
+                except ValueError as e:
+                    await self._send(connection, {'error': f"{type(e).__name__}: {e}"})
+                    continue
+                if "cancel" in job:
+                    cancelled = self._cancel(connection, job["cancel"])
+                    await self._send(connection, {'cancel': job["cancel"], 'found': cancelled})
+                    continue
+                key = next(connection.keys)
+                connection.requests[key] = [job.get("id"), None, None]
+                connection.tasks[key] = asyncio.create_task(self._run(connection, key, job))
+        finally:
+            if connection.gone:
+                self._cancel_all(connection)
+            if connection.tasks:
+                await asyncio.gather(*connection.tasks.values(), return_exceptions=True)
+            writer.close()
+
+    async def _run(self, connection, key, job):
+        request_id = job.get("id")
+        connection.waiting += 1
+        if connection.waiting >= connection.max_waiting:
+            connection.readable.clear()
+        try:
+            await self._capacity.acquire() # A cancel while waiting here is answered by _cancel
+        finally:
+            connection.waiting -= 1
+            if connection.waiting < connection.max_waiting:
+                connection.readable.set()
+
+        slot = self._free_slots.pop()
+        self._cancel_flags[slot] = 0
+        try:
+            future = self._submit(job, slot)
+        except Exception as e: # Not even a fresh pool takes the job: fail this request, not the service
+            connection.requests.pop(key, None)
+            connection.tasks.pop(key, None)
+            self._free_slots.append(slot)
+            self._capacity.release()
+            await self._send(connection, {'id': request_id, 'error': f"{type(e).__name__}: {e}"})
+            return
+        connection.requests[key][1:] = [slot, future]
+        try:
+            record = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise
+            record = {'id': request_id, 'cancelled': True}
+        except Exception as e: # A crashed worker fails this request, not the service
+            record = {'id': request_id, 'error': f"{type(e).__name__}: {e}"}
+        finally:
+            connection.requests.pop(key, None)
+            connection.tasks.pop(key, None)
+            self._free_slots.append(slot)
+            self._capacity.release()
+        await self._send(connection, record)
+
+    def _cancel(self, connection, request_id):
+        found = False
+        for key, (entry_id, slot, future) in list(connection.requests.items()):
+            if entry_id != request_id:
+                continue
+            found = True
+            if future is None: # Still waiting for a pool slot
+                task = connection.tasks.pop(key)
+                del connection.requests[key]
+                task.cancel()
+                # Answered here: a task cancelled before it first ran never reaches its except clause
+                self._spawn_send(connection, {'id': entry_id, 'cancelled': True})
+            elif not future.cancel(): # Already running: the worker polls the flag
+                self._cancel_flags[slot] = 1
+        return found
+
+    def _spawn_send(self, connection, record):
+        # _send for synchronous callers; tracked as a task so the connection stays open until it is written
+        key = next(connection.keys)
+        task = asyncio.create_task(self._send(connection, record))
+        connection.tasks[key] = task
+        task.add_done_callback(lambda _: connection.tasks.pop(key, None))
+
+    def _cancel_all(self, connection):
+        for request_id in {entry[0] for entry in connection.requests.values()}:
+            self._cancel(connection, request_id)
+
+    async def _send(self, connection, record):
+        async with connection.write_lock:
+            if connection.gone:
+                return
+            writer = connection.writer
+            try:
+                if writer.is_closing():
+                    raise ConnectionResetError()
+                writer.write(json.dumps(record, separators=(',', ':')).encode() + b"\n")
+                await writer.drain()
+            except ConnectionError:
+                connection.gone = True
+                self._cancel_all(connection)
+
+
+def run_service(address, workers=None, max_pending=None):
+    service = GraphService(workers, max_pending)
+    try:
+        asyncio.run(service.serve(address))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,131 @@
+from array import array
+
+
+def _low_degree_vertex(csr, min_degree=2):
+    offsets = csr.offsets
+    for u in range(1, csr.num_nodes + 1):
+        degree = offsets[u + 1] - offsets[u]
+        if degree < min_degree:
+            return {'check': "min_degree", 'vertex': u, 'degree': degree}
+    return None
+
+
+def _cut_vertex(csr):
+    """Articulation point of a connected graph by Tarjan's low-link DFS, or None.
+
+    The DFS keeps its state in arrays (a cursor per vertex instead of a frame), so it runs at
+    any graph size without touching the recursion limit.
+    """
+    num_nodes, offsets, neighbours = csr.num_nodes, csr.offsets, csr.neighbours
+    disc = array('i', bytes(4 * (num_nodes + 1))) # Discovery time, 0 = unvisited
+    low = array('i', bytes(4 * (num_nodes + 1)))
+    parent = array('i', bytes(4 * (num_nodes + 1)))
+    cursor = array('q', offsets)
+    root = 1
+    disc[root] = low[root] = timer = 1
+    root_children = 0
+    stack = array('i', [root])
+    while stack:
+        u = stack[-1]
+        pos = cursor[u]
+        if pos < offsets[u + 1]:
+            cursor[u] = pos + 1
+            v = neighbours[pos]
+            if not disc[v]:
+                parent[v] = u
+                timer += 1
+                disc[v] = low[v] = timer
+                stack.append(v)
+                if u == root:
+                    root_children += 1
+            elif v != parent[u] and disc[v] < low[u]:
+                low[u] = disc[v]
+        else:
+            stack.pop()
+            if stack:
+                p = parent[u]
+                if low[u] < low[p]:
+                    low[p] = low[u]
+                if p != root and low[u] >= disc[p]:
+                    return p
+    return root if root_children > 1 else None
+
+
+def _bipartite_sides(csr):
+    """(size of side A, size of side B) for a connected bipartite graph, None if it has an odd cycle."""
+    num_nodes, offsets, neighbours = csr.num_nodes, csr.offsets, csr.neighbours
+    colour = bytearray(num_nodes + 1) # 0 = unvisited, else 1 or 2
+    colour[1] = 1
+    queue = array('i', [1])
+    for u in queue: # The array grows while it is walked
+        other = 3 - colour[u]
+        for pos in range(offsets[u], offsets[u + 1]):
+            v = neighbours[pos]
+            if not colour[v]:
+                colour[v] = other
+                queue.append(v)
+            elif colour[v] != other:
+                return None
+    side_a = colour.count(1)
+    return side_a, num_nodes - side_a
+
+
+def hamiltonian_obstruction(csr):
+    """Returns a certificate (dict) proving that the graph has no Hamiltonian cycle, or None.
+
+    A None result proves nothing: the graph passed every cheap necessary condition. The checks
+    are a vertex of degree < 2, more than one component, a cut vertex, and a bipartite graph
+    with sides of different sizes (a Hamiltonian cycle alternates sides).
+    """
+    num_nodes = csr.num_nodes
+    if num_nodes < 3:
+        return None
+    certificate = _low_degree_vertex(csr)
+    if certificate is not None:
+        return certificate
+    # Every vertex has edges now, so the edge components are the components
+    components = csr.edge_component_count()
+    if components > 1:
+        return {'check': "disconnected", 'components': components}
+    cut = _cut_vertex(csr)
+    if cut is not None:
+        return {'check': "cut_vertex", 'vertex': cut}
+    sides = _bipartite_sides(csr)
+    if sides is not None and sides[0] != sides[1]:
+        return {'check': "bipartite_imbalance", 'sides': sides}
+    return None
+
+
+def hamiltonian_path_obstruction(csr):
+    """Like hamiltonian_obstruction, for a Hamiltonian path: an isolated vertex, more than two
+    vertices of degree 1 (only the ends of a path can have one), more than one component, or a
+    bipartite graph whose sides differ by more than one."""
+    num_nodes, offsets = csr.num_nodes, csr.offsets
+    if num_nodes < 2:
+        return None
+    certificate = _low_degree_vertex(csr, min_degree=1)
+    if certificate is not None:
+        return certificate
+    leaves = sum(1 for u in range(1, num_nodes + 1) if offsets[u + 1] - offsets[u] == 1)
+    if leaves > 2:
+        return {'check': "degree_one", 'vertices': leaves}
+    components = csr.edge_component_count()
+    if components > 1:
+        return {'check': "disconnected", 'components': components}
+    sides = _bipartite_sides(csr)
+    if sides is not None and abs(sides[0] - sides[1]) > 1:
+        return {'check': "bipartite_imbalance", 'sides': sides}
+    return None
+
+
+def describe_obstruction(certificate):
+    check = certificate['check']
+    if check == "min_degree":
+        return f"vertex {certificate['vertex']} has degree {certificate['degree']}"
+    if check == "degree_one":
+        return f"{certificate['vertices']} vertices have degree 1 (a path has two ends)"
+    if check == "disconnected":
+        return f"the graph has {certificate['components']} connected components"
+    if check == "cut_vertex":
+        return f"vertex {certificate['vertex']} is a cut vertex"
+    return f"the graph is bipartite with unequal sides {certificate['sides'][0]} and {certificate['sides'][1]}"